@@ -0,0 +1,255 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+# Deterministic headless benchmark of every shape, without a frame cap.
+# Each frame is split into the stages below and timed separately, results are
+# written as JSON so runs from different revisions can be compared.
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame  # noqa: E402
+
+import shapes  # noqa: E402
+
+STAGES = ("generate", "transform", "project", "shade", "rasterize", "present")
+SHAPES = ("cube", "tesseract", "donut", "earth", "earth-lit", "earth-tiled")
+ANGLE_STEP = 0.01
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def __call__(self, name):
+        start = time.perf_counter()
+        yield
+        self.samples[name].append(time.perf_counter() - start)
+
+
+def setup_wireframe(shape):
+    from transform import apply
+
+    source = shapes.Wireframe(shape)
+    instance = source.instance
+    window = pygame.display.set_mode(source.size)
+    origin = source.origin
+
+    def frame(stage, angle):
+        window.fill(source.background)
+        instance.angle = angle
+        with stage("transform"):
+            matrix = instance.matrix()
+        with stage("project"):
+            projected = apply(matrix, instance.homogeneous) + origin
+        with stage("rasterize"):
+            instance.draw_projected(window, projected)
+        with stage("present"):
+            pygame.display.update()
+
+    return frame
+
+
+def setup_donut():
+    import torus
+
+    source = shapes.Donut()
+    donut = source.donut
+    columns, rows = source.columns, source.rows
+    cell_width, cell_height = source.cell
+    window = pygame.display.set_mode(source.size)
+
+    def frame(stage, phi):
+        window.fill(source.background)
+        with stage("generate"):
+            points, normals = torus.get_torus_and_normal(*source.spacing)
+        with stage("transform"):
+            rotated, rotated_normal = torus.rotate_torus(points, normals, phi)
+        with stage("shade"):
+            L = torus.matmul(rotated_normal, torus.light_dir)
+        with stage("project"):
+            projected = torus.project_torus(rotated)
+            ooz = 1 / (torus.k2 + rotated[:, 2])
+        with stage("rasterize"):
+            grid = torus.resolve_cells(projected, ooz, L, columns, rows, cell_width, cell_height)
+            cell_rows, cell_columns = np.nonzero(grid >= 0)
+            donut.get_glyphs().draw(
+                window,
+                ((cell_columns + 0.5) * cell_width).tolist(),
+                ((cell_rows + 0.5) * cell_height).tolist(),
+                grid[cell_rows, cell_columns].tolist(),
+            )
+        with stage("present"):
+            pygame.display.update()
+
+    return frame
+
+
+def setup_earth(lit=False, workers=None):
+    """Time the renderer earth.main uses, at the level of detail it picks at zoom 1."""
+    source = shapes.Earth(workers)
+    screen = pygame.display.set_mode(source.size)
+    vertices, texels, renderer = source.vertices, source.texels, source.renderer
+    normals = source.lod.normals(source.level) if lit else None
+
+    def frame(stage, angle):
+        screen.fill((0, 0, 0))
+        with stage("transform"):
+            x, y, z = renderer.transform(vertices, angle)
+        with stage("project"):
+            index, screen_x, screen_y = renderer.project(x, y, z)
+        with stage("rasterize"):
+            # depth test, shading and pixel writes, as shipped
+            pixels = pygame.surfarray.pixels3d(screen)
+            renderer.splat(pixels, texels, z, index, screen_x, screen_y, None if normals is None else (normals, angle))
+            del pixels
+        with stage("present"):
+            pygame.display.flip()
+
+    return frame
+
+
+def setup(shape):
+    if shape in ("cube", "tesseract"):
+        return setup_wireframe(shape)
+    if shape == "donut":
+        return setup_donut()
+    if shape == "earth-lit":
+        return setup_earth(lit=True)
+    if shape == "earth-tiled":
+        return setup_earth(workers=os.cpu_count())
+    return setup_earth()
+
+
+def summarize(samples):
+    samples = np.asarray(samples) * 1000
+    return {
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+
+def measure_allocations(frame, frames):
+    """Peak bytes allocated and gen-0 collections per frame, traced separately."""
+    noop = StageTimer()
+    peaks = []
+    collections = gc.get_stats()[0]["collections"]
+    tracemalloc.start()
+    for i in range(frames):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        frame(noop, i * ANGLE_STEP)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return {
+        "peak_bytes_mean": float(np.mean(peaks)),
+        "peak_bytes_max": int(np.max(peaks)),
+        "gc_gen0_per_frame": (gc.get_stats()[0]["collections"] - collections) / frames,
+    }
+
+
+def bench_shape(shape, frames, warmup=10, alloc_frames=20):
+    start = time.perf_counter()
+    frame = setup(shape)
+    setup_time = time.perf_counter() - start
+    for i in range(warmup):
+        frame(StageTimer(), i * ANGLE_STEP)
+
+    timer = StageTimer()
+    totals = []
+    for i in range(frames):
+        start = time.perf_counter()
+        frame(timer, i * ANGLE_STEP)
+        totals.append(time.perf_counter() - start)
+
+    # a stage that runs twice in a frame is summed per frame
+    stages = {}
+    for name in STAGES:
+        samples = timer.samples.get(name)
+        if samples:
+            stages[name] = summarize(np.asarray(samples).reshape(frames, -1).sum(axis=1))
+    total = summarize(totals)
+    return {
+        "setup_ms": setup_time * 1000,
+        "frame": dict(total, fps=1000 / total["mean_ms"]),
+        "stages": stages,
+        "allocations": measure_allocations(frame, alloc_frames),
+    }
+
+
+def revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline):
+    for shape, current in result["shapes"].items():
+        if shape not in baseline["shapes"]:
+            continue
+        before = baseline["shapes"][shape]
+        ratio = current["frame"]["mean_ms"] / before["frame"]["mean_ms"]
+        print(f"{shape:12s} frame {before['frame']['mean_ms']:8.3f} -> {current['frame']['mean_ms']:8.3f} ms  x{ratio:.2f}")
+        for name, stage in current["stages"].items():
+            if name in before["stages"]:
+                old = before["stages"][name]["mean_ms"]
+                print(f"{'':12s} {name:9s} {old:8.3f} -> {stage['mean_ms']:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rotating shapes headlessly")
+    parser.add_argument("shapes", nargs="*", help=f"any of {', '.join(SHAPES)}, defaults to all")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--out", default="bench_output.json", help="JSON results file, - for stdout")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    args = parser.parse_args()
+    for shape in args.shapes:
+        if shape not in SHAPES:
+            parser.error(f"unknown shape '{shape}'")
+
+    result = {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "frames": args.frames,
+        "shapes": {},
+    }
+    for shape in args.shapes or SHAPES:
+        result["shapes"][shape] = bench_shape(shape, args.frames)
+        frame = result["shapes"][shape]["frame"]
+        print(
+            f"{shape:12s} {frame['mean_ms']:8.3f} ms mean  {frame['p99_ms']:8.3f} ms p99  {frame['fps']:8.1f} fps",
+            file=sys.stderr,
+        )
+
+    if args.out == "-":
+        json.dump(result, sys.stdout, indent=2)
+    else:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 import sys
 import pygame
-import numpy as np
+
+from dirty import DirtyRects
+from hypercube import Hypercube
+from keyframes import KeyframeCache
+from profiler import Profiler
+from scheduler import Scheduler
 
 
 WIDTH = 800
 HEIGHT = 800
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
 
 ORIGIN_X = WIDTH // 2
 ORIGIN_Y = HEIGHT // 2
@@ -14,108 +18,58 @@ BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 
 EDGE_LENGTH = 1
+DISTANCE = 2
+DEPTH_RATIO = 1.4  # low enough that distance is never pushed back
 
 
-class Cube:
+class Cube(Hypercube):
     def __init__(self):
-        self.angle = 0
-        self.points = [
-            np.array([-EDGE_LENGTH, -EDGE_LENGTH, -EDGE_LENGTH]),
-            np.array([EDGE_LENGTH, -EDGE_LENGTH, -EDGE_LENGTH]),
-            np.array([EDGE_LENGTH, EDGE_LENGTH, -EDGE_LENGTH]),
-            np.array([-EDGE_LENGTH, EDGE_LENGTH, -EDGE_LENGTH]),
-            np.array([-EDGE_LENGTH, -EDGE_LENGTH, EDGE_LENGTH]),
-            np.array([EDGE_LENGTH, -EDGE_LENGTH, EDGE_LENGTH]),
-            np.array([EDGE_LENGTH, EDGE_LENGTH, EDGE_LENGTH]),
-            np.array([-EDGE_LENGTH, EDGE_LENGTH, EDGE_LENGTH]),
-        ]
-
-    def rotate(self):
-        theta = self.angle
-        # projection matrix without perspective
-        PROJECTION = np.array([[1, 0, 0], [0, 1, 0]])
-
-        # rotation matrixes
-        ROT_MATRIX_X = np.array(
-            [
-                [1, 0, 0],
-                [0, np.cos(theta), -np.sin(theta)],
-                [0, np.sin(theta), np.cos(theta)],
-            ]
-        )
-
-        ROT_MATRIX_Y = np.array(
-            [
-                [np.cos(theta), 0, np.sin(theta)],
-                [0, 1, 0],
-                [-np.sin(theta), 0, np.cos(theta)],
-            ]
-        )
-
-        ROT_MATRIX_Z = np.array(
-            [
-                [np.cos(theta), -np.sin(theta), 0],
-                [np.sin(theta), np.cos(theta), 0],
-                [0, 0, 1],
-            ]
+        super().__init__(
+            3,
+            planes={3: [(1, 2), (2, 0), (0, 1)]},  # x, y, z
+            edge_length=EDGE_LENGTH,
+            distance=DISTANCE,
+            depth_ratio=DEPTH_RATIO,
         )
 
-        projected = []
-
-        for point in self.points:
-            rotated = np.dot(ROT_MATRIX_X, point)
-            rotated = np.dot(ROT_MATRIX_Y, rotated)
-            rotated = np.dot(ROT_MATRIX_Z, rotated)
-
-            DISTANCE = 2
-            z = 2 / (DISTANCE - rotated[2] / 2)
-            # PROJECTION adjusted to give perspective
-            PROJECTION = np.array([[z, 0, 0], [0, z, 0]])
-            projected2d = np.dot(PROJECTION, rotated)
-            projected2d *= 100
-            projected.append(projected2d)
-
-        return projected
-
-    def draw(self):
-        def connect(i, j, points):
-            a = points[i]
-            b = points[j]
-            pygame.draw.line(
-                WIN,
-                WHITE,
-                (ORIGIN_X + a[0], ORIGIN_Y + a[1]),
-                (ORIGIN_X + b[0], ORIGIN_Y + b[1]),
-                1,
-            )
-
-        projected = self.rotate()
-        # draw corners
-        for coordinate in projected:
-            pygame.draw.circle(
-                WIN, WHITE, (ORIGIN_X + coordinate[0], ORIGIN_Y + coordinate[1]), 5
-            )
-        # draw edges
-        for i in range(4):
-            connect(i, (i + 1) % 4, projected)
-            connect(i + 4, ((i + 1) % 4) + 4, projected)
-            connect(i, i + 4, projected)
+    def draw(self, surface):
+        return super().draw(surface, (ORIGIN_X, ORIGIN_Y))
 
 
-def main():
+def main(profile=None, keyframes=None):
+    win = pygame.display.set_mode((WIDTH, HEIGHT))
     cube = Cube()
     clock = pygame.time.Clock()
+    profiler = Profiler(stream=profile)
+    dirty = DirtyRects(win, BLACK)
+    scheduler = Scheduler(75)  # the angle turns 0.01 per step
+    angle = previous = 0
+    # with keyframes, each quantized angle is projected once and then looked up
+    project = KeyframeCache(cube.rotate, keyframes) if keyframes else cube.rotate
     run = True
     while run:
-        WIN.fill(BLACK)
-        clock.tick(75)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                run = False
-                sys.exit()
-        cube.angle += 0.01
-        cube.draw()
-        pygame.display.update()
+        dirty.clear()
+        with profiler.span("tick"):
+            clock.tick(75)
+        with profiler.span("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    run = False
+                    sys.exit()
+                profiler.handle_event(event)
+        with profiler.span("update"):
+            for _ in range(scheduler.advance()):
+                previous, angle = angle, angle + 0.01
+            cube.angle = scheduler.interpolate(previous, angle)
+        with profiler.span("transform"):
+            projected = project(cube.angle)
+        with profiler.span("raster"):
+            drawn = cube.draw_projected(win, projected + (ORIGIN_X, ORIGIN_Y))
+        with profiler.span("overlay"):
+            overlay = profiler.draw(win)
+        with profiler.span("flip"):
+            dirty.present([drawn, overlay])
+        profiler.frame()
 
 
 if __name__ == "__main__":
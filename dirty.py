@@ -0,0 +1,36 @@
+import pygame
+
+# Dirty-rectangle presentation: every frame clears only what the previous
+# frame drew and uploads only the union of the previous and current areas,
+# instead of filling and flipping the whole window.
+
+
+class DirtyRects:
+    """Tracks the areas drawn last frame on a surface."""
+
+    def __init__(self, surface, color=(0, 0, 0)):
+        self.surface = surface
+        self.color = color
+        self.previous = []
+
+    def clear(self):
+        """Erase everything drawn in the previous frame."""
+        for rect in self.previous:
+            self.surface.fill(self.color, rect)
+
+    def present(self, rects):
+        """Update the display where the previous or this frame drew, given this frame's rects."""
+        rects = [pygame.Rect(rect) for rect in rects if rect]
+        changed = rects + self.previous
+        if changed:
+            pygame.display.update(changed[0].unionall(changed[1:]))
+        self.previous = rects
+
+
+def points_rect(xs, ys, margin):
+    """Bounding rect of point arrays, grown by margin pixels on every side."""
+    if len(xs) == 0:
+        return None
+    left = int(min(xs)) - margin
+    top = int(min(ys)) - margin
+    return pygame.Rect(left, top, int(max(xs)) + margin + 1 - left, int(max(ys)) + margin + 1 - top)
@@ -1,145 +1,140 @@
-import pygame as pg
-from numpy import array, cos, sin, pi, matmul, dot, sqrt
-import pygame.font
+import time
 
-# TODO: same sh!t, in terminal
+import pygame as pg
+from numpy import int8, nonzero
 
-pygame.font.init()
+from dirty import DirtyRects
+from glyphs import get_atlas
+from keyframes import KeyframeCache
+from pipeline import FramePipeline
+from profiler import Profiler
+from scheduler import AdaptiveQuality, Scheduler
+from torus import ASCII, phi_increment, phi_spacing, shade_torus, shade_torus_grid, size, the_spacing
 
 # CONSTANTS
-width, height = 800, 800
-win = pg.display.set_mode((width, height))
-pg.display.set_caption("Rotating Donut")
+width, height = size, size
 fps = 75
 origin_x = width // 2
 origin_y = height // 2
-font = pg.font.SysFont("comicsans", 30)
 
 
 black = (0, 0, 0)
 white = (200, 200, 200)
 
-ASCII = ".,-~:;=!*#$@"
-# ASCII = "@BR#$PX0woIcv:+!~.,"[::-1]
-
-the_spacing = 0.35
-phi_spacing = 0.15
-phi_increment = 0.05  # increment for each frame
-
-r1 = 1
-r2 = 2
-k2 = 50
-k1 = width * k2 * 3 / (8 * (r1 + r2))
-
-light_dir = array((0, 1, -1))
-len_light_vec = sqrt(light_dir[0] ** 2 + light_dir[1] ** 2 + light_dir[2] ** 2)
-
-# todo improve the getting normal for points
-def get_circle_and_normal(the_spacing=the_spacing):
-    the = 0
-    circle = []
-    normal = []
-    while the <= 2 * pi:
-        circle.append(array([r2 + r1 * cos(the), r1 * sin(the), 0]))
-        normal.append(array([cos(the), sin(the), 0]))
-        the += the_spacing
-    return circle, normal
-
-
-def get_torus_and_normal():
-    circle, normal = get_circle_and_normal()
-    torus = []
-    torus_normal = []
-    phi = 0
-    while phi <= 2 * pi:
-        for i, point in enumerate(circle):
-            normal_ = normal[i]
-            torus.append(rotate_y(point, phi))
-            torus_normal.append(rotate_y(normal_, phi))
-        phi += phi_spacing
-    return torus, torus_normal
-
-
-def rotate_y(point, phi):
-    rotation_mat = array([(cos(phi), 0, sin(phi)), (0, 1, 0), (-sin(phi), 0, cos(phi))])
-    return matmul(point, rotation_mat)
-
-
-def rotate_x(point, phi):
-    rotation_mat = array([(1, 0, 0), (0, cos(phi), sin(phi)), (0, -sin(phi), cos(phi))])
-    return matmul(point, rotation_mat)
-
-
-def rotate_z(point, phi):
-    rotation_mat = array([(cos(phi), sin(phi), 0), (-sin(phi), cos(phi), 0), (0, 0, 1)])
-    return matmul(point, rotation_mat)
-
-
-def rotate_torus(torus, normal, phi):
-    rotated_torus = []
-    rotated_normal = []
-    for i, point in enumerate(torus):
-        normal_ = normal[i]
-        rotated_torus.append(rotate_z(rotate_x(point, phi), phi))
-        rotated_normal.append(rotate_z(rotate_x(normal_, phi), phi))
-    return rotated_torus, rotated_normal
-
-
-def project_torus(torus):
-    projected_torus = []
-    for x, y, z in torus:
-        projected_torus.append(array((k1 * x / (k2 + z), k1 * y / (k2 + z))))
-    return projected_torus
-
-
-def project_point(point):
-    x, y, z = point
-    return k1 * x / (k2 + z), k1 * y / (k2 + z)
-
-
-# todo dont draw points behind already drawn points
-def update(phi):
-    torus, normal = get_torus_and_normal()
-    rotated_torus, rotated_normal = rotate_torus(torus, normal, phi)
-    for i, point in enumerate(rotated_torus):
-        normal = rotated_normal[i]
-        L = dot(normal, light_dir)
-        if L > 0:
-
-            x, y = project_point(point)
-            # pg.draw.circle(win, white, (origin_x + x, origin_y - y), 3 * L)
-
-            index = round(((len(ASCII) - 1) * L / len_light_vec))
-            char = ASCII[index]
-            text_img = font.render(char, True, white)
-            win.blit(
-                text_img,
-                (
-                    origin_x + x - text_img.get_width() // 2,
-                    origin_y - y - text_img.get_height() // 2,
-                ),
-            )
-
-
-def main():
+# character cells of the grid renderer
+cell_width = 12
+cell_height = 20
+grid_columns = width // cell_width
+grid_rows = height // cell_height
+
+# point spacings per quality level, coarser levels shade fewer points
+spacings = [(the_spacing * factor, phi_spacing * factor) for factor in (1, 1.5, 2)]
+
+
+# the atlas of the donut's characters, built on first use
+def get_glyphs():
+    return get_atlas(ASCII, white)
+
+
+# draws every lit point, including points behind already drawn points
+def update(phi, surface, spacing=spacings[0]):
+    xs, ys, indices = shade_torus(phi, *spacing)
+    return get_glyphs().draw(surface, (origin_x + xs).tolist(), (origin_y - ys).tolist(), indices.tolist())
+
+
+# draws each character cell once, with the nearest point of the cell
+def update_grid(phi, surface, spacing=spacings[0]):
+    return draw_grid(shade_torus_grid(phi, grid_columns, grid_rows, cell_width, cell_height, *spacing), surface)
+
+
+def grid_shader(spacing):
+    """Return a function of phi giving the character grid at spacing."""
+    return lambda phi: shade_torus_grid(phi, grid_columns, grid_rows, cell_width, cell_height, *spacing)
+
+
+def draw_grid(grid, surface):
+    rows, columns = nonzero(grid >= 0)
+    return get_glyphs().draw(
+        surface,
+        ((columns + 0.5) * cell_width).tolist(),
+        ((rows + 0.5) * cell_height).tolist(),
+        grid[rows, columns].tolist(),
+    )
+
+
+def main(profile=None, keyframes=None, pipelined=False):
+    win = pg.display.set_mode((width, height))
+    pg.display.set_caption("Rotating Donut")
     running = True
     clock = pg.time.Clock()
-    phi = 0
+    profiler = Profiler(stream=profile)
+    dirty = DirtyRects(win, black)
+    scheduler = Scheduler(fps)  # phi turns phi_increment per step
+    quality = AdaptiveQuality(len(spacings), 1000 / fps)
+    phi = previous_phi = 0
+    render_ms = None
+    shade = {spacing: grid_shader(spacing) for spacing in spacings}
+    if keyframes:
+        # each quantized phi's grid is shaded once per spacing and then looked up
+        shade = {spacing: KeyframeCache(shader, keyframes, dtype=int8) for spacing, shader in shade.items()}
+    grid = True  # toggled with G
+
+    def render(surface):
+        """Advance the animation and draw the donut, return the drawn rect."""
+        nonlocal phi, previous_phi, render_ms
+        for _ in range(scheduler.advance()):
+            previous_phi, phi = phi, phi + phi_increment
+        shown_phi = scheduler.interpolate(previous_phi, phi)
+        spacing = spacings[quality.update(render_ms)]
+
+        render_start = time.perf_counter()
+        if grid:
+            drawn = draw_grid(shade[spacing](shown_phi), surface)
+        else:
+            drawn = update(shown_phi, surface, spacing)
+        render_ms = (time.perf_counter() - render_start) * 1000
+        return drawn, None
+
+    # with pipelining the next frames render on a thread while this one presents
+    pipeline = FramePipeline(win, render, color=black) if pipelined else None
     while running:
-        clock.tick(fps)
-        win.fill(black)
-        for e in pg.event.get():
-            if e.type == pg.QUIT:
-                running = False
-            if e.type == pg.KEYDOWN:
-                if e.key == pg.K_ESCAPE:
+        with profiler.span("tick"):
+            clock.tick(fps)
+        with profiler.span("events"):
+            for e in pg.event.get():
+                if e.type == pg.QUIT:
                     running = False
-        update(phi)
-
-        phi += phi_increment
-        pg.display.update()
-        fps_ = int(clock.get_fps())
-        # print("fps: ", fps_)
+                if e.type == pg.KEYDOWN:
+                    if e.key == pg.K_ESCAPE:
+                        running = False
+                    if e.key == pg.K_g:
+                        grid = not grid
+                profiler.handle_event(e)
+
+        if pipeline is None:
+            with profiler.span("raster"):
+                dirty.clear()
+                drawn, _ = render(win)
+        else:
+            with profiler.span("wait"):
+                frame = pipeline.get()
+            with profiler.span("raster"):
+                dirty.clear()
+                drawn = frame.drawn
+                if drawn:
+                    win.blit(frame.surface, drawn, drawn)
+                pipeline.release(frame)
+
+        with profiler.span("overlay"):
+            overlay = profiler.draw(win)
+        with profiler.span("flip"):
+            dirty.present([drawn, overlay])
+        profiler.frame()
+    if pipeline is not None:
+        stats = pipeline.stats()
+        print(f"latency {stats['latency_ms']:.1f} ms, queue depth {stats['queue_depth']:.1f}")
+        pipeline.close()
+    profiler.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+import argparse
+import shutil
+import sys
+import time
+
+from scheduler import Scheduler
+from torus import ASCII, phi_increment, shade_torus_grid, size
+
+# Terminal backend for the rotating donut, runs without pygame
+
+HOME = "\x1b[H"
+CLEAR = "\x1b[2J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+
+STEP_RATE = 75  # phi turns phi_increment per step, the rate of donut.main
+
+
+def grid_to_lines(grid):
+    chars = ASCII + " "  # index -1 is an empty cell
+    return ["".join([chars[i] for i in row]) for row in grid.tolist()]
+
+
+class TerminalRenderer:
+    """Writes frames to a terminal, sending only the changed span of each row."""
+
+    def __init__(self, columns, rows, out=sys.stdout):
+        self.columns = columns
+        self.rows = rows
+        self.out = out
+        self.previous = [None] * rows
+
+    def frame(self, lines, status=""):
+        """Return the escape sequence that turns the previous frame into lines."""
+        parts = [HOME]
+        for row, line in enumerate(lines):
+            previous = self.previous[row]
+            if previous is None:
+                start, end = 0, len(line)
+            else:
+                start = 0
+                while start < len(line) and line[start] == previous[start]:
+                    start += 1
+                if start == len(line):
+                    continue
+                end = len(line)
+                while line[end - 1] == previous[end - 1]:
+                    end -= 1
+            parts.append(f"\x1b[{row + 1};{start + 1}H{line[start:end]}")
+            self.previous[row] = line
+        if status:
+            parts.append(f"\x1b[{self.rows + 1};1H{status}\x1b[K")
+        return "".join(parts)
+
+    def draw(self, lines, status=""):
+        """Write a whole frame with a single buffered write, return bytes written."""
+        data = self.frame(lines, status)
+        self.out.write(data)
+        self.out.flush()
+        return len(data.encode())
+
+
+def main(frames=None, max_fps=None):
+    terminal = shutil.get_terminal_size()
+    # characters are about twice as tall as wide, keep one line for the status
+    rows = max(1, min(terminal.lines - 1, terminal.columns // 2))
+    columns = rows * 2
+    cell_width = size / columns
+    cell_height = size / rows
+
+    renderer = TerminalRenderer(columns, rows)
+    sys.stdout.write(HIDE_CURSOR + CLEAR)
+    scheduler = Scheduler(STEP_RATE)
+    phi = previous_phi = 0
+    frame = 0
+    status = ""
+    last_report = time.perf_counter()
+    reported_frames = 0
+    written = 0
+    try:
+        while frames is None or frame < frames:
+            start = time.perf_counter()
+            for _ in range(scheduler.advance()):
+                previous_phi, phi = phi, phi + phi_increment
+            shown_phi = scheduler.interpolate(previous_phi, phi)
+            grid = shade_torus_grid(shown_phi, columns, rows, cell_width, cell_height)
+            written += renderer.draw(grid_to_lines(grid), status)
+            frame += 1
+            reported_frames += 1
+
+            now = time.perf_counter()
+            if now - last_report >= 0.5:
+                status = (
+                    f"{reported_frames / (now - last_report):6.1f} fps "
+                    f"{written / reported_frames:7.0f} bytes/frame"
+                )
+                last_report = now
+                reported_frames = 0
+                written = 0
+            if max_fps:
+                time.sleep(max(0, 1 / max_fps - (time.perf_counter() - start)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout.write(SHOW_CURSOR + f"\x1b[{rows + 1};1H\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rotating donut in the terminal")
+    parser.add_argument("--frames", type=int, help="stop after this many frames")
+    parser.add_argument("--fps", type=float, default=30, help="frame rate cap, 0 for none")
+    args = parser.parse_args()
+    main(args.frames, args.fps)
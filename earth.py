@@ -1,13 +1,26 @@
 import numpy as np
 import pygame
+import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-pygame.init()
+from dirty import DirtyRects, points_rect
+from pipeline import FramePipeline
+from profiler import Profiler
+from scheduler import AdaptiveQuality, Scheduler
+from texture import StreamingTexture
 
 LAND_COLORS = [(0, 255, 0)] 
 WATER_COLORS = [(0, 0, 255)] 
 
+# Window and globe of main, shapes.py builds the same for the offline tools
+WIDTH, HEIGHT = 800, 600
+RADIUS = 200
+# Finest level of detail, level 1 matches 500 x 50 at zoom 1
+BASE_RESOLUTION_THETA = 1000  # Higher resolution at equator
+BASE_RESOLUTION_PHI = 100  # Vertical resolution
+
 WORLD_MAP = [
     "............................................................................................................................................",
     "............................................................................................................................................",
@@ -45,11 +58,112 @@ WORLD_MAP = [
     "..........+++++++++++++++++++++++++++++++..........+....+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++......."
 ]
 
-def map_texture_to_sphere(u, v):
+def compile_ascii_map(rows, land='+'):
+    """Compile an ASCII map into a uint8 bitmap (1 for land, 0 for water)."""
+    return np.array([[c == land for c in row] for row in rows], dtype=np.uint8)
+
+def _load_npy(path):
+    """Load a 2D .npy bitmap, memory-mapped."""
+    return np.load(path, mmap_mode='r')
+
+def _load_pnm(path):
+    """Load a binary PBM (P4), PGM (P5) or PPM (P6) texture.
+
+    PGM and PPM pixel data is memory-mapped; PBM rows are bit-packed and get
+    unpacked. Nonzero bitmap texels are land.
+    """
+    with open(path, 'rb') as f:
+        data = f.read(4096)
+    fields = []
+    pos = 0
+    wanted = 3 if data[:2] == b'P4' else 4
+    while len(fields) < wanted:
+        while pos < len(data) and data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b'#':
+            pos = data.find(b'\n', pos)
+            if pos < 0:
+                break
+            continue
+        end = pos
+        while end < len(data) and not data[end:end + 1].isspace():
+            end += 1
+        if end == len(data):
+            break  # a field needs whitespace after it
+        fields.append(data[pos:end])
+        pos = end
+    if len(fields) < wanted:
+        raise ValueError(f"Truncated PNM header in {path}")
+    offset = pos + 1  # single whitespace before the raster
+    magic, width, height = fields[0], int(fields[1]), int(fields[2])
+
+    if magic == b'P5':
+        dtype = np.uint8 if int(fields[3]) < 256 else np.dtype('>u2')
+        return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(height, width))
+    if magic == b'P6':
+        if int(fields[3]) >= 256:
+            raise ValueError(f"Only 8-bit PPM textures are supported, {path} has maxval {int(fields[3])}")
+        return np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(height, width, 3))
+    if magic == b'P4':
+        packed = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(height, (width + 7) // 8))
+        return np.unpackbits(packed, axis=1)[:, :width]
+    raise ValueError(f"Unsupported PNM format {magic!r} in {path}")
+
+def _load_raw(path):
+    """Load a headerless 8-bit texture, memory-mapped: .rgb holds RGB texels, .raw palette indices.
+
+    The size is part of the file name, as in world.21600x10800.rgb.
+    """
+    stem, ext = os.path.splitext(os.path.basename(path))
+    try:
+        width, height = (int(n) for n in os.path.splitext(stem)[1][1:].split('x'))
+    except ValueError:
+        raise ValueError(f"Raw texture {path} needs its size in the name, as in world.21600x10800{ext}") from None
+    shape = (height, width, 3) if ext.lower() == '.rgb' else (height, width)
+    return np.memmap(path, dtype=np.uint8, mode='r', shape=shape)
+
+# Texture loaders by file extension, extend to support more formats
+TEXTURE_LOADERS = {
+    '.npy': _load_npy,
+    '.pbm': _load_pnm,
+    '.pgm': _load_pnm,
+    '.ppm': _load_pnm,
+    '.rgb': _load_raw,
+    '.raw': _load_raw,
+}
+
+def load_texture(path):
+    """Load a (height, width) bitmap or (height, width, 3) RGB texture using the loader for its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in TEXTURE_LOADERS:
+        raise ValueError(f"No texture loader for '{ext}' files")
+    bitmap = TEXTURE_LOADERS[ext](path)
+    if bitmap.ndim != 2 and bitmap.shape[2:] != (3,):
+        raise ValueError(f"Texture {path} must be a 2D bitmap or RGB, got shape {bitmap.shape}")
+    return bitmap
+
+def open_texture(path, max_bytes=64 << 20):
+    """Open a texture file for streaming, see StreamingTexture.
+
+    Indexed texels use the colors of a sidecar <name>.palette.npy when there
+    is one, otherwise 0 is water and anything else land.
+    """
+    source = load_texture(path)
+    palette = None
+    if source.ndim == 2:
+        palette_path = os.path.splitext(path)[0] + '.palette.npy'
+        if os.path.exists(palette_path):
+            palette = np.load(palette_path)
+        else:
+            palette = [WATER_COLORS[0], LAND_COLORS[0]]
+    return StreamingTexture(source, palette, max_bytes=max_bytes)
+
+WORLD_BITMAP = compile_ascii_map(WORLD_MAP)
+
+def map_texture_to_sphere(u, v, bitmap=WORLD_BITMAP):
     """Map texture coordinates to world map."""
     # Convert normalized coordinates to map indices
-    map_height = len(WORLD_MAP)
-    map_width = len(WORLD_MAP[0])
+    map_height, map_width = bitmap.shape
     
     # Map u (0 to 1) to x (0 to map_width-1)
     # Map v (0 to 1) to y (0 to map_height-1)
@@ -57,46 +171,176 @@ def map_texture_to_sphere(u, v):
     y = int(v * map_height) % map_height
     
     # Return 1 for land, 0 for water
-    return 1 if WORLD_MAP[y][x] == '+' else 0
+    return 1 if bitmap[y, x] else 0
+
+def texel_classes(texture_coords, bitmap=WORLD_BITMAP):
+    """Look up the land/water class of every vertex once (1 for land, 0 for water).
+
+    The texture coordinates of the sphere never change, so the result can be
+    kept next to the vertex arrays and reused every frame.
+    """
+    map_height, map_width = bitmap.shape
+    x = (texture_coords[:, 0] * map_width).astype(np.int64) % map_width
+    y = (texture_coords[:, 1] * map_height).astype(np.int64) % map_height
+    return (np.asarray(bitmap[y, x]) != 0).astype(np.uint8)
+
+def adaptive_ring_sizes(base_resolution_theta, base_resolution_phi):
+    """Number of points on each latitude ring of the adaptive sphere."""
+    phi = np.arange(base_resolution_phi) * np.pi / (base_resolution_phi - 1)
+    # Reduce resolution near poles, maximize at equator, with at least
+    # 25% of base resolution and 8 points per latitude ring
+    latitude_factor = np.sin(phi)  # 0 at poles, 1 at equator
+    adjusted_factor = 0.25 + 0.75 * latitude_factor
+    return np.maximum(8, (base_resolution_theta * adjusted_factor).astype(np.int64))
 
 def create_adaptive_sphere(radius, base_resolution_theta, base_resolution_phi):
-    """Create a sphere with variable resolution"""
-    vertices = []
-    texture_coords = []
-    
+    """Create a sphere with variable resolution.
+
+    Returns contiguous (N, 3) vertices and (N, 2) texture coordinates.
+    """
     # Use adaptive resolution along phi (latitude)
-    for i in range(base_resolution_phi):
-        # Calculate the current phi angle (0 to π)
-        phi = i * np.pi / (base_resolution_phi - 1)
-        
-        # Calculate adaptive resolution for theta based on latitude
-        # Reduce resolution near poles, maximize at equator
-        latitude_factor = np.sin(phi)  # 0 at poles, 1 at equator
-        
-        # Ensure minimum resolution even at poles (at least 25% of base)
-        adjusted_factor = 0.25 + 0.75 * latitude_factor
-        
-        # Calculate adaptive resolution for this latitude ring
-        adaptive_resolution_theta = max(8, int(base_resolution_theta * adjusted_factor))
-        
-        # Generate points around this latitude ring
-        for j in range(adaptive_resolution_theta):
-            theta = j * 2 * np.pi / adaptive_resolution_theta
-            
-            # Calculate 3D coordinates with 90 degree rotation
-            x = radius * np.sin(phi) * np.cos(theta)
-            y = -radius * np.cos(phi)
-            z = radius * np.sin(phi) * np.sin(theta)
-            
-            # Calculate texture coordinates with map alignment
-            u = (1 - (j / adaptive_resolution_theta) + 0.25) % 1.0
-            v = i / (base_resolution_phi - 1)
-            
-            vertices.append((x, y, z))
-            texture_coords.append((u, v))
-    
+    ring = np.arange(base_resolution_phi)
+    phi = ring * np.pi / (base_resolution_phi - 1)
+    ring_sizes = adaptive_ring_sizes(base_resolution_theta, base_resolution_phi)
+
+    # Ring index and position within the ring of every point
+    ring_starts = np.cumsum(ring_sizes) - ring_sizes
+    i = np.repeat(ring, ring_sizes)
+    size = np.repeat(ring_sizes, ring_sizes)
+    j = np.arange(size.size) - np.repeat(ring_starts, ring_sizes)
+    phi = phi[i]
+    theta = j * 2 * np.pi / size
+
+    # Calculate 3D coordinates with 90 degree rotation
+    vertices = np.empty((size.size, 3))
+    vertices[:, 0] = radius * np.sin(phi) * np.cos(theta)
+    vertices[:, 1] = -radius * np.cos(phi)
+    vertices[:, 2] = radius * np.sin(phi) * np.sin(theta)
+
+    # Calculate texture coordinates with map alignment
+    texture_coords = np.empty((size.size, 2))
+    texture_coords[:, 0] = (1 - (j / size) + 0.25) % 1.0
+    texture_coords[:, 1] = i / (base_resolution_phi - 1)
     return vertices, texture_coords
 
+def sphere_normals(vertices):
+    """Unit normals of a sphere centered at the origin, its normalized vertex positions."""
+    return (vertices / np.linalg.norm(vertices, axis=1, keepdims=True)).astype(np.float32)
+
+def sphere_triangles(base_resolution_theta, base_resolution_phi):
+    """Index buffer of the adaptive sphere as a (T, 3) int array.
+
+    Neighbouring rings have different sizes, so they are zipped together in
+    order of their points' angle, one triangle per point.
+    """
+    ring_sizes = adaptive_ring_sizes(base_resolution_theta, base_resolution_phi)
+    ring_starts = np.cumsum(ring_sizes) - ring_sizes
+    triangles = []
+    for ring in range(base_resolution_phi - 1):
+        size_a, size_b = ring_sizes[ring], ring_sizes[ring + 1]
+        # Every step advances on ring a or ring b, in order of angle
+        fractions = np.concatenate((np.arange(1, size_a + 1) / size_a, np.arange(1, size_b + 1) / size_b))
+        on_a = np.arange(size_a + size_b) < size_a
+        on_a = on_a[np.argsort(fractions, kind='stable')]
+        a = np.cumsum(on_a)  # points of ring a reached after each step
+        b = np.cumsum(~on_a)
+        previous_a = np.where(on_a, a - 1, a) % size_a + ring_starts[ring]
+        previous_b = np.where(on_a, b, b - 1) % size_b + ring_starts[ring + 1]
+        new = np.where(on_a, a % size_a + ring_starts[ring], b % size_b + ring_starts[ring + 1])
+        triangles.append(np.stack((previous_a, previous_b, new), axis=1))
+    return np.concatenate(triangles)
+
+def default_cache_dir():
+    """Directory for cached meshes, following XDG_CACHE_HOME."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'rotating-shapes')
+
+def load_sphere(radius, base_resolution_theta, base_resolution_phi, cache_dir=None):
+    """create_adaptive_sphere, cached on disk as .npz when cache_dir is given."""
+    if cache_dir is None:
+        return create_adaptive_sphere(radius, base_resolution_theta, base_resolution_phi)
+    path = os.path.join(
+        cache_dir, f'sphere_r{radius}_t{base_resolution_theta}_p{base_resolution_phi}.npz'
+    )
+    try:
+        with np.load(path) as mesh:
+            return mesh['vertices'], mesh['texture_coords']
+    except Exception:
+        pass  # missing, empty, truncated or corrupt, regenerate it
+    vertices, texture_coords = create_adaptive_sphere(radius, base_resolution_theta, base_resolution_phi)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write under a temporary name so readers never see a partial file
+        partial = path + '.partial.npz'
+        np.savez(partial, vertices=vertices, texture_coords=texture_coords)
+        os.replace(partial, path)
+    except OSError:
+        pass  # the cache is an optimization only
+    return vertices, texture_coords
+
+class SphereLOD:
+    """Sphere meshes at several resolutions, level 0 being the finest.
+
+    Each level halves the resolution of the one before it. A level is picked
+    from the projected screen radius, keeping the point density the finest
+    mesh has at the base radius, and is made coarser while frames run over
+    budget.
+    """
+
+    def __init__(self, radius, base_resolution_theta, base_resolution_phi, levels=4,
+                 bitmap=WORLD_BITMAP, cache_dir=None):
+        self.radius = radius
+        self.bitmap = bitmap
+        self.levels = []
+        for level in range(levels):
+            theta_res = max(8, base_resolution_theta >> level)
+            phi_res = max(3, base_resolution_phi >> level)
+            vertices, texture_coords = load_sphere(radius, theta_res, phi_res, cache_dir)
+            self.levels.append((theta_res, phi_res, vertices, texture_coords))
+        self.texels = {}  # looked up on first use, a streaming texture is read lazily
+        self.index_buffers = {}
+        self.vertex_normals = {}
+        self.base_resolution_theta = base_resolution_theta
+        self.quality = AdaptiveQuality(levels)  # extra coarseness while over the frame budget
+
+    def select(self, screen_radius, frame_ms=None, budget_ms=1000 / 60):
+        """Return the level index for a globe of screen_radius pixels."""
+        self.quality.budget_ms = budget_ms
+        bias = self.quality.update(frame_ms)
+        # Keep the density the finest level has at the base radius
+        needed = self.base_resolution_theta * screen_radius / self.radius / 2
+        level = 0
+        while level + 1 < len(self.levels) and self.levels[level + 1][0] >= needed:
+            level += 1
+        return min(level + bias, len(self.levels) - 1)
+
+    def mesh(self, level):
+        """Return the (vertices, texels) of a level.
+
+        texels are land/water classes for a bitmap, colors for a StreamingTexture.
+        """
+        theta_res, _, vertices, texture_coords = self.levels[level]
+        if level not in self.texels:
+            if isinstance(self.bitmap, StreamingTexture):
+                u, v = texture_coords.T
+                self.texels[level] = self.bitmap.sample(u, v, self.bitmap.level_for(theta_res))
+            else:
+                self.texels[level] = texel_classes(texture_coords, self.bitmap)
+        return vertices, self.texels[level]
+
+    def normals(self, level):
+        """Return the (N, 3) unit normals of a level, computed once."""
+        if level not in self.vertex_normals:
+            self.vertex_normals[level] = sphere_normals(self.levels[level][2])
+        return self.vertex_normals[level]
+
+    def surface(self, level):
+        """Return the (vertices, texture_coords, triangles) of a level."""
+        theta_res, phi_res, vertices, texture_coords = self.levels[level]
+        if level not in self.index_buffers:
+            self.index_buffers[level] = sphere_triangles(theta_res, phi_res)
+        return vertices, texture_coords, self.index_buffers[level]
+
 def rotate_y(point, angle):
     """Rotate a point around the y-axis."""
     x, y, z = point
@@ -137,60 +381,515 @@ def render_earth(vertices, texture_coords, screen, width, height, angle, radius)
     
     pixels.close()
 
-def main():
-    width, height = 800, 600
+# Point splatting, lit point splatting, filled triangles, or per-pixel ray casting.
+# Filled triangles are a reference path: in NumPy they take several frames'
+# worth of time (60-130 ms per frame at LOD 1), the HUD labels them as slow.
+RENDER_MODES = ("points", "lit", "triangles", "raycast")
+
+# Lighting in view space, where the viewer looks along +z. The light comes
+# from the upper left, in front of the globe.
+LIGHT_DIR = np.array([-0.5, -0.6, -1.0]) / np.linalg.norm([-0.5, -0.6, -1.0])
+HALF_VECTOR = (LIGHT_DIR + [0, 0, -1]) / np.linalg.norm(LIGHT_DIR + [0, 0, -1])
+AMBIENT = 0.08
+SHININESS = 40
+TWILIGHT = 0.15  # width of the glow along the terminator, in units of n.l
+TWILIGHT_GLOW = (70, 30, 0)
+LIGHT_LEVELS = 256
+
+def lighting_tables(levels=LIGHT_LEVELS):
+    """Brightness and glow per quantized n.l, and highlight per quantized n.h.
+
+    Level k stands for n.l = -1 + 2k / (levels - 1). Everything nonlinear,
+    the terminator and the specular exponent, lives in these tables, so
+    shading a frame is a few lookups.
+    """
+    diffuse = np.linspace(-1, 1, levels)
+    brightness = AMBIENT + (1 - AMBIENT) * np.maximum(diffuse, 0)
+    band = np.clip(1 - np.abs(diffuse) / TWILIGHT, 0, 1) ** 2
+    glow = band[:, None] * np.array(TWILIGHT_GLOW)
+    highlight = 255 * np.linspace(0, 1, levels) ** SHININESS
+    return brightness.astype(np.float32), glow.astype(np.float32), highlight.astype(np.uint8)
+
+def bounds(screen_x, screen_y):
+    """The (x0, y0, x1, y1) box of non-empty screen positions."""
+    return int(screen_x.min()), int(screen_y.min()), int(screen_x.max()) + 1, int(screen_y.max()) + 1
+
+
+def resolve_depth(depth_buffer, screen_x, screen_y, depth):
+    """Scatter-min depth into a (rows, width) buffer; return the indices of the winners."""
+    flat = depth_buffer.reshape(-1)
+    pixel = screen_y * depth_buffer.shape[1] + screen_x
+    depth = depth.astype(np.float32)
+    np.minimum.at(flat, pixel, depth)
+
+    nearest = np.flatnonzero(depth == flat[pixel])
+    _, first = np.unique(pixel[nearest], return_index=True)
+    return nearest[first]
+
+
+class EarthRenderer:
+    """Batched Earth renderer that owns a persistent depth buffer.
+
+    The depth buffer is a preallocated float32 array holding -z per pixel, so
+    a scatter-min resolves many points at once. Between frames it is reset only
+    over the bounding box written by the previous frame.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.depth = np.full((height, width), np.inf, dtype=np.float32)
+        self.dirty = None  # (x0, y0, x1, y1) written by the last frame
+        self.palette = np.array([WATER_COLORS[0], LAND_COLORS[0]], dtype=np.uint8)
+        self.brightness, self.glow, self.highlight = lighting_tables()
+        # (classes, LIGHT_LEVELS, 3) lit color of every class at every n.l
+        lit = self.palette[:, None, :] * self.brightness[None, :, None] + self.glow[None]
+        self.lit_palette = np.minimum(lit, 255).astype(np.uint8)
+        self._disc = None
+
+    def clear(self):
+        """Reset the depth buffer over the area touched by the last frame."""
+        if self.dirty is not None:
+            x0, y0, x1, y1 = self.dirty
+            self.depth[y0:y1, x0:x1] = np.inf
+            self.dirty = None
+
+    def resolve(self, screen_x, screen_y, depth):
+        """Depth test many points at once; return the indices of the winners.
+
+        A point wins its pixel when it has the smallest depth, the earliest
+        point on ties.
+        """
+        self.clear()
+        if screen_x.size == 0:
+            return screen_x
+        self.dirty = bounds(screen_x, screen_y)
+        return resolve_depth(self.depth, screen_x, screen_y, depth)
+
+    def written(self):
+        """The rect written by the last resolve, None when nothing was."""
+        if self.dirty is None:
+            return None
+        x0, y0, x1, y1 = self.dirty
+        return pygame.Rect(x0, y0, x1 - x0, y1 - y0)
+
+    def transform(self, vertices, angle, scale=1.0):
+        """Rotate all vertices around the y-axis and scale, return x, y and z arrays."""
+        x, y, z = vertices[:, 0], vertices[:, 1], vertices[:, 2]
+        cos_a, sin_a = scale * np.cos(angle), scale * np.sin(angle)
+        if scale != 1.0:
+            y = y * scale
+        return x * cos_a + z * sin_a, y, -x * sin_a + z * cos_a
+
+    def project(self, x, y, z):
+        """Return the indices and screen positions of the visible vertices."""
+        # Only render points that are on the front half (facing viewer)
+        screen_x = (self.width / 2 + x).astype(np.int64)
+        screen_y = (self.height / 2 + y).astype(np.int64)
+        visible = (
+            (z < 0)
+            & (screen_x >= 0) & (screen_x < self.width)
+            & (screen_y >= 0) & (screen_y < self.height)
+        )
+        index = np.flatnonzero(visible)
+        return index, screen_x[index], screen_y[index]
+
+    def rasterize(self, pixels, vertices, texels, angle):
+        """Write the Earth into a (width, height, 3) pixel array.
+
+        texels holds the land/water class of every vertex, see texel_classes.
+        """
+        x, y, z = self.transform(vertices, angle)
+        index, screen_x, screen_y = self.project(x, y, z)
+
+        return self.splat(pixels, texels, z, index, screen_x, screen_y)
+
+    def splat(self, pixels, texels, z, index, screen_x, screen_y, lighting=None):
+        """Depth test the projected vertices and write the colors of the winners.
+
+        lighting is the (normals, angle) of the mesh to light it, see shade.
+        Returns the rect that was written.
+        """
+        # Largest z wins, stored as -z so the resolve is a scatter-min
+        winners = self.resolve(screen_x, screen_y, -z[index])
+        pixels[screen_x[winners], screen_y[winners]] = self.shade(texels, index[winners], lighting)
+        return self.written()
+
+    def rasterize_triangles(self, pixels, vertices, texture_coords, triangles, bitmap, angle, scale=1.0):
+        """Fill the front-facing triangles of the sphere, sampling the bitmap per pixel."""
+        x, y, z = self.transform(vertices, angle, scale)
+        screen_x = self.width / 2 + x
+        screen_y = self.height / 2 + y
+        a, b, c = triangles.T
+
+        # Back-face culling: the outward normal, oriented by the centroid
+        # since the sphere is convex, must point towards the viewer (-z)
+        e1 = np.stack((x[b] - x[a], y[b] - y[a], z[b] - z[a]))
+        e2 = np.stack((x[c] - x[a], y[c] - y[a], z[c] - z[a]))
+        normal = np.cross(e1, e2, axis=0)
+        outward = np.sign(
+            normal[0] * (x[a] + x[b] + x[c]) + normal[1] * (y[a] + y[b] + y[c]) + normal[2] * (z[a] + z[b] + z[c])
+        )
+        area = (screen_x[b] - screen_x[a]) * (screen_y[c] - screen_y[a]) - (screen_y[b] - screen_y[a]) * (screen_x[c] - screen_x[a])
+        front = (normal[2] * outward < 0) & (area != 0)
+        corners = triangles[front]
+        area = area[front]
+
+        # Pixel centres covered by each triangle's bounding box, triangles
+        # covering none (off screen or between centres) are dropped
+        tri_x, tri_y = screen_x[corners], screen_y[corners]
+        x0 = np.maximum(np.ceil(tri_x.min(axis=1) - 0.5), 0).astype(np.int64)
+        x1 = np.minimum(np.floor(tri_x.max(axis=1) - 0.5), self.width - 1).astype(np.int64)
+        y0 = np.maximum(np.ceil(tri_y.min(axis=1) - 0.5), 0).astype(np.int64)
+        y1 = np.minimum(np.floor(tri_y.max(axis=1) - 0.5), self.height - 1).astype(np.int64)
+        keep = (x1 >= x0) & (y1 >= y0)
+        if not keep.any():
+            self.clear()
+            return None
+        corners, area, tri_x, tri_y, x0, x1, y0, y1 = (part[keep] for part in (corners, area, tri_x, tri_y, x0, x1, y0, y1))
+
+        # Texture coordinates unwrapped across the seam within each triangle
+        u = texture_coords[corners, 0]
+        u[:, 1:] -= np.round(u[:, 1:] - u[:, :1])
+        v = texture_coords[corners, 1]
+
+        # Barycentric weights are affine in the pixel position, w = A x + B y + C
+        inv_area = 1 / area
+        sx0, sx1, sx2 = tri_x.T
+        sy0, sy1, sy2 = tri_y.T
+        edge_a = np.stack(((sy1 - sy2) * inv_area, (sy2 - sy0) * inv_area), axis=1)
+        edge_b = np.stack(((sx2 - sx1) * inv_area, (sx0 - sx2) * inv_area), axis=1)
+        edge_c = np.stack(((sy2 - sy1) * sx1 - (sx2 - sx1) * sy1, (sy0 - sy2) * sx2 - (sx0 - sx2) * sy2), axis=1) * inv_area[:, None]
+        # Weights at the first pixel centre of the bounding box
+        edge_c += edge_a * (x0 + 0.5)[:, None] + edge_b * (y0 + 0.5)[:, None]
+
+        # On each row of its bounding box a triangle covers the columns where
+        # all three weights are >= 0. Each weight is affine in the column, so
+        # every edge crosses zero at a column affine in the row, a lower bound
+        # where the weight rises and an upper bound where it falls. Horizontal
+        # edges lie on the box's top or bottom and bound nothing. Only the
+        # covered pixels of each row's span are generated.
+        slope = np.column_stack((edge_a, -edge_a.sum(axis=1)))
+        offset = np.column_stack((edge_c, 1 - edge_c.sum(axis=1)))
+        step = np.column_stack((edge_b, -edge_b.sum(axis=1)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cross_offset = -offset / slope
+            cross_step = np.where(slope != 0, -step / slope, 0)
+        # Lower bounds in the first three columns, upper bounds in the last three
+        bounds_at_row = np.hstack((
+            np.where(slope > 0, cross_offset, -np.inf), np.where(slope < 0, cross_offset, np.inf),
+            np.where(slope > 0, cross_step, 0), np.where(slope < 0, cross_step, 0),
+        ))
+
+        # Per-triangle values are copied to rows and rows to pixels with
+        # np.repeat, rows of a (triangles, values) array copy contiguously
+        heights = y1 - y0 + 1
+        row = np.arange(heights.sum()) - np.repeat(np.cumsum(heights) - heights, heights)
+        bound_offset, bound_step = np.hsplit(np.repeat(bounds_at_row, heights, axis=0), 2)
+        bound = bound_offset + bound_step * row[:, None]
+        first = np.maximum(np.ceil(np.maximum(np.maximum(bound[:, 0], bound[:, 1]), bound[:, 2])), 0)
+        last = np.minimum(np.floor(np.minimum(np.minimum(bound[:, 3], bound[:, 4]), bound[:, 5])), np.repeat(x1 - x0, heights))
+        counts = np.maximum(last - first + 1, 0).astype(np.int64)
+        covered = np.flatnonzero(counts)
+        if covered.size == 0:
+            self.clear()
+            return None
+        owner = np.repeat(np.arange(len(heights)), heights)[covered]
+        row, first, counts = row[covered], first[covered], counts[covered]
+
+        # Texture coordinates interpolate the weights, so they are affine in
+        # the pixel position too and step by a constant along each span
+        du = u[:, :2] - u[:, 2:]
+        dv = v[:, :2] - v[:, 2:]
+        row_x, row_y, u_a, u_b, u_c, v_a, v_b, v_c = np.column_stack((
+            x0, y0,
+            (edge_a * du).sum(axis=1), (edge_b * du).sum(axis=1), (edge_c * du).sum(axis=1) + u[:, 2],
+            (edge_a * dv).sum(axis=1), (edge_b * dv).sum(axis=1), (edge_c * dv).sum(axis=1) + v[:, 2],
+        ))[owner].T
+        span_x, hit_y, span_u, u_a, span_v, v_a = np.repeat(np.column_stack((
+            row_x + first, row_y + row, u_c + u_b * row + u_a * first, u_a, v_c + v_b * row + v_a * first, v_a,
+        )), counts, axis=0).T
+        column = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        hit_x = (span_x + column).astype(np.int64)
+        hit_y = hit_y.astype(np.int64)
+        hit_u = span_u + u_a * column
+        hit_v = span_v + v_a * column
+
+        # Front faces of a convex mesh never overlap on screen, so no depth
+        # test is needed, pixels on a shared edge take either triangle
+        self.clear()
+        self.dirty = bounds(hit_x, hit_y)
+        circumference = 2 * np.pi * np.sqrt(vertices[0] @ vertices[0]) * scale
+        pixels[hit_x, hit_y] = self.sample(bitmap, hit_u, hit_v, circumference)
+        return self.written()
+
+    def disc(self, radius):
+        """Per-pixel view geometry of a sphere of radius pixels, cached for the last radius."""
+        if self._disc is not None and self._disc[0] == radius:
+            return self._disc[1]
+        center_x, center_y = self.width / 2, self.height / 2
+        xs = np.arange(max(0, int(center_x - radius)), min(self.width, int(np.ceil(center_x + radius)) + 1))
+        ys = np.arange(max(0, int(center_y - radius)), min(self.height, int(np.ceil(center_y + radius)) + 1))
+        px, py = np.meshgrid(xs, ys, indexing='ij')
+        x = px + 0.5 - center_x
+        y = py + 0.5 - center_y
+        inside = x * x + y * y < radius * radius
+        px, py, x, y = px[inside], py[inside], x[inside], y[inside]
+        disc_bounds = points_rect(px, py, 0)
+        z = -np.sqrt(radius * radius - x * x - y * y)  # front hemisphere
+        # Rotating the sphere only shifts theta, so it is stored unrotated
+        theta = np.arctan2(z, x)
+        v = np.arccos(np.clip(-y / radius, -1, 1)) / np.pi
+        geometry = (px, py, theta, v, disc_bounds)
+        self._disc = (radius, geometry)
+        return geometry
+
+    def raycast(self, pixels, bitmap, angle, radius):
+        """Shade every pixel inside the sphere's disc from its sphere UV directly, return its rect."""
+        px, py, theta, v, disc_bounds = self.disc(radius)
+        self.shade_disc(pixels, bitmap, angle, radius, px, py, theta, v)
+        return disc_bounds
+
+    def shade_disc(self, pixels, bitmap, angle, radius, px, py, theta, v):
+        u = (1 - (theta + angle) / (2 * np.pi) + 0.25) % 1.0
+        pixels[px, py] = self.sample(bitmap, u, v, 2 * np.pi * radius)
+
+    def colors(self, texels):
+        """Colors of per-vertex texels, land/water classes go through the palette."""
+        return texels if texels.ndim == 2 else self.palette[texels]
+
+    def shade(self, texels, vertex, lighting=None):
+        """Colors of the chosen vertices, lit when lighting is given.
+
+        lighting is (normals, angle). Only the chosen vertices' normals are
+        rotated, their Lambert term picks the lit_palette level and water
+        gets a Blinn-Phong highlight on top.
+        """
+        if lighting is None:
+            return self.colors(texels[vertex])
+        normals, angle = lighting
+        nx, ny, nz = self.transform(normals[vertex], angle)
+        diffuse = nx * LIGHT_DIR[0] + ny * LIGHT_DIR[1] + nz * LIGHT_DIR[2]
+        level = ((diffuse + 1) * ((LIGHT_LEVELS - 1) / 2)).astype(np.intp)
+        texels = texels[vertex]
+        if texels.ndim == 2:
+            # RGB texels have no land/water classes, so no highlight
+            lit = texels * self.brightness[level, None] + self.glow[level]
+            return np.minimum(lit, 255).astype(np.uint8)
+
+        colors = self.lit_palette[texels, level]
+        specular = nx * HALF_VECTOR[0] + ny * HALF_VECTOR[1] + nz * HALF_VECTOR[2]
+        shiny = np.flatnonzero((texels == 0) & (diffuse > 0) & (specular > 0))
+        highlight = self.highlight[(specular[shiny] * (LIGHT_LEVELS - 1)).astype(np.intp)]
+        colors[shiny] = np.minimum(colors[shiny].astype(np.int16) + highlight[:, None], 255)
+        return colors
+
+    def sample(self, bitmap, u, v, circumference):
+        """Colors of a bitmap or StreamingTexture at texture coordinates u and v.
+
+        A streaming texture is read at the mipmap level matching a globe of
+        circumference pixels.
+        """
+        if isinstance(bitmap, StreamingTexture):
+            return bitmap.sample(u, v, bitmap.level_for(circumference))
+        map_height, map_width = bitmap.shape
+        texel_x = np.floor(u * map_width).astype(np.int64) % map_width
+        texel_y = np.floor(v * map_height).astype(np.int64) % map_height
+        return self.palette[(np.asarray(bitmap[texel_y, texel_x]) != 0).astype(np.uint8)]
+
+    def render(self, vertices, texels, screen, angle):
+        """Render the Earth onto a pygame surface.
+
+        vertices is a contiguous (N, 3) float array, texels its (N,) texel classes.
+        """
+        screen.fill((0, 0, 0))
+        pixels = pygame.surfarray.pixels3d(screen)
+        self.rasterize(pixels, vertices, texels, angle)
+        del pixels
+
+
+class TiledEarthRenderer(EarthRenderer):
+    """EarthRenderer splitting the screen into horizontal bands drawn on a thread pool.
+
+    Points are binned by band and every band is resolved against its own rows
+    of the depth buffer and written to its own rows of the pixel array, so
+    workers never touch the same memory. The NumPy kernels release the GIL.
+    """
+
+    def __init__(self, width, height, workers=None, band_height=64):
+        super().__init__(width, height)
+        self.band_height = band_height
+        self.workers = workers or os.cpu_count()
+        self.pool = ThreadPoolExecutor(self.workers)
+
+    def bands(self, screen_y):
+        """Bin points by band, return the sort order and each band's (band, start, end)."""
+        band = (screen_y // self.band_height).astype(np.int16)
+        order = np.argsort(band, kind='stable')  # radix sort, keeps the earliest point first
+        numbers, starts = np.unique(band[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        return order, zip(numbers.tolist(), starts.tolist(), ends.tolist())
+
+    def splat(self, pixels, texels, z, index, screen_x, screen_y, lighting=None):
+        """Depth test and write the projected vertices band by band, return the written rect."""
+        self.clear()
+        if screen_x.size == 0:
+            return None
+        order, bands = self.bands(screen_y)
+
+        def band(number, start, end):
+            chosen = order[start:end]
+            top = number * self.band_height
+            x, y = screen_x[chosen], screen_y[chosen]
+            rows = self.depth[top:top + self.band_height]
+            winners = chosen[resolve_depth(rows, x, y - top, -z[index[chosen]])]
+            pixels[screen_x[winners], screen_y[winners]] = self.shade(texels, index[winners], lighting)
+
+        for _ in self.pool.map(lambda args: band(*args), bands):
+            pass
+        self.dirty = bounds(screen_x, screen_y)
+        return self.written()
+
+    def raycast(self, pixels, bitmap, angle, radius):
+        """Shade the sphere's disc in one chunk per worker, return its rect."""
+        px, py, theta, v, disc_bounds = self.disc(radius)
+        edges = np.linspace(0, len(px), self.workers + 1).astype(int)
+        parts = [slice(start, end) for start, end in zip(edges[:-1], edges[1:])]
+        for _ in self.pool.map(
+            lambda part: self.shade_disc(pixels, bitmap, angle, radius, px[part], py[part], theta[part], v[part]), parts
+        ):
+            pass
+        return disc_bounds
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def main(texture=None, profile=None, workers=None, band_height=64, pipelined=False):
+    width, height = WIDTH, HEIGHT
     screen = pygame.display.set_mode((width, height))
     pygame.display.set_caption("3D Earth Simulation (Optimized)")
     
     clock = pygame.time.Clock()
     
-    radius = 200
-    base_resolution_theta = 500  # Higher resolution at equator
-    base_resolution_phi = 50    # Vertical resolution
-    vertices, texture_coords = create_adaptive_sphere(radius, base_resolution_theta, base_resolution_phi)
+    radius = RADIUS
+    bitmap = WORLD_BITMAP if texture is None else open_texture(texture)
+    lod = SphereLOD(radius, BASE_RESOLUTION_THETA, BASE_RESOLUTION_PHI,
+                    bitmap=bitmap, cache_dir=default_cache_dir())
+    if workers:
+        renderer = TiledEarthRenderer(width, height, workers, band_height)
+    else:
+        renderer = EarthRenderer(width, height)
+    zoom = 1.0
+    render_ms = None
+    mode = 0  # index into RENDER_MODES, cycled with M
     
-    # Animation settings
-    angle = 0
-    frame_count = 0
-    start_time = time.time()
+    # Animation settings, the angle advances by rotation_speed 60 times a second
+    scheduler = Scheduler(60)
+    angle = previous_angle = 0
     running = True
     rotation_speed = 0.1
     
+    def render(surface):
+        """Advance the animation and draw the globe, return the drawn rect and the LOD info."""
+        nonlocal angle, previous_angle, render_ms
+        for _ in range(scheduler.advance()):
+            previous_angle, angle = angle, angle + rotation_speed
+        shown_angle = scheduler.interpolate(previous_angle, angle)
+
+        render_start = time.perf_counter()
+        level = lod.select(radius * zoom, render_ms)
+        vertices, texels = lod.mesh(level)
+        pixels = pygame.surfarray.pixels3d(surface)
+        if RENDER_MODES[mode] in ("points", "lit"):
+            x, y, z = renderer.transform(vertices, shown_angle, zoom)
+            index, screen_x, screen_y = renderer.project(x, y, z)
+            lighting = (lod.normals(level), shown_angle) if RENDER_MODES[mode] == "lit" else None
+            drawn = renderer.splat(pixels, texels, z, index, screen_x, screen_y, lighting)
+        elif RENDER_MODES[mode] == "triangles":
+            vertices, texture_coords, triangles = lod.surface(level)
+            drawn = renderer.rasterize_triangles(pixels, vertices, texture_coords, triangles, bitmap, shown_angle, zoom)
+        else:
+            drawn = renderer.raycast(pixels, bitmap, shown_angle, radius * zoom)
+        del pixels
+        render_ms = (time.perf_counter() - render_start) * 1000
+        label = "triangles (slow)" if RENDER_MODES[mode] == "triangles" else RENDER_MODES[mode]
+        return drawn, f"{label}, LOD {level}: {len(vertices)} points"
+
+    # With pipelining the next frames render on a thread while this one presents
+    pipeline = FramePipeline(screen, render) if pipelined else None
+    
+    pygame.font.init()
     font = pygame.font.SysFont(None, 24)
+    profiler = Profiler(stream=profile)
+    dirty = DirtyRects(screen)
     
     # Main animation loop
     while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_q or event.key == pygame.K_ESCAPE:
+        with profiler.span("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
                     running = False
-                # Control rotation speed
-                elif event.key == pygame.K_UP:
-                    rotation_speed += 0.005
-                elif event.key == pygame.K_DOWN:
-                    rotation_speed = max(0.001, rotation_speed - 0.005)
-        
-        render_earth(vertices, texture_coords, screen, width, height, angle, radius)
-        
-        frame_count += 1
-        elapsed = time.time() - start_time
-        fps = frame_count / elapsed if elapsed > 0 else 0
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_q or event.key == pygame.K_ESCAPE:
+                        running = False
+                    # Control rotation speed
+                    elif event.key == pygame.K_UP:
+                        rotation_speed += 0.005
+                    elif event.key == pygame.K_DOWN:
+                        rotation_speed = max(0.001, rotation_speed - 0.005)
+                    # Zoom
+                    elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                        zoom = min(4.0, zoom * 1.1)
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        zoom = max(0.1, zoom / 1.1)
+                    elif event.key == pygame.K_m:
+                        mode = (mode + 1) % len(RENDER_MODES)
+                    else:
+                        profiler.handle_event(event)
         
-        fps_text = font.render(f"FPS: {fps:.1f} | Rotation: {rotation_speed:.3f}", True, (255, 255, 255))
-        screen.blit(fps_text, (10, height - 50))
-        help_text = font.render("Press UP/DOWN to change speed, Q to exit", True, (255, 255, 255))
-        screen.blit(help_text, (10, height - 25))
+        if pipeline is None:
+            with profiler.span("raster"):
+                dirty.clear()
+                drawn, info = render(screen)
+        else:
+            with profiler.span("wait"):
+                frame = pipeline.get()
+            with profiler.span("raster"):
+                dirty.clear()
+                drawn, info = frame.drawn, frame.info
+                if drawn:
+                    screen.blit(frame.surface, drawn, drawn)
+                pipeline.release(frame)
+                stats = pipeline.stats()
+                info += f" | latency {stats['latency_ms']:.1f} ms, queue {stats['queue_depth']:.1f}"
         
-        pygame.display.flip()
+        with profiler.span("overlay"):
+            # Rolling average of the last few frames, not a lifetime average
+            fps = clock.get_fps()
+            fps_text = font.render(
+                f"FPS: {fps:.1f} | Rotation: {rotation_speed:.3f} | {info}",
+                True, (255, 255, 255),
+            )
+            fps_rect = screen.blit(fps_text, (10, height - 50))
+            help_text = font.render("Press UP/DOWN to change speed, +/- to zoom, M for mode, F3 for profiler, Q to exit", True, (255, 255, 255))
+            help_rect = screen.blit(help_text, (10, height - 25))
+            overlay = profiler.draw(screen)
         
-        angle += rotation_speed
+        with profiler.span("flip"):
+            dirty.present([drawn, fps_rect, help_rect, overlay])
         
-        clock.tick(60)
+        with profiler.span("tick"):
+            clock.tick(60)
+        profiler.frame()
     
+    if pipeline is not None:
+        pipeline.close()
+    profiler.close()
+    if workers:
+        renderer.close()
     pygame.quit()
     print("Exited smoothly")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+import shapes
+
+# Offline exporter: renders a fixed angle range to PNG frames or a raw RGB
+# stream on offscreen surfaces, split across a process pool. Workers encode
+# and save their own PNGs, only the raw stream sends pixels back, in order.
+
+SHAPES = shapes.SHAPES
+
+_render_frame = None  # per-worker render function, set by _init_worker
+_out = None  # per-worker png directory
+
+
+def make_renderer(shape):
+    """Return (size, render) where render(angle) draws one frame onto a new surface."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+
+    source = shapes.make(shape)
+
+    def render(angle):
+        surface = pygame.Surface(source.size)
+        source.draw(surface, angle)
+        return surface
+
+    return source.size, render
+
+
+def _init_worker(shape, out=None):
+    global _render_frame, _out
+    _, _render_frame = make_renderer(shape)
+    _out = out
+
+
+def _render(angle):
+    import pygame
+
+    return pygame.image.tobytes(_render_frame(angle), "RGB")
+
+
+def _save(job):
+    import pygame
+
+    number, angle = job
+    pygame.image.save(_render_frame(angle), os.path.join(_out, f"frame_{number:05d}.png"))
+    return number
+
+
+def export(shape, angles, out, fmt="png", workers=None, chunksize=4):
+    """Render every angle and write the frames, return the frame count.
+
+    fmt "png" writes out/frame_00000.png and so on, "raw" writes a stream of
+    packed RGB frames in order to the file out, or to stdout when out is "-".
+    """
+    context = multiprocessing.get_context("spawn")
+    if fmt == "png":
+        os.makedirs(out, exist_ok=True)
+        stream = None
+    elif out == "-":
+        stream = sys.stdout.buffer
+    else:
+        stream = open(out, "wb")
+
+    count = 0
+    try:
+        with context.Pool(workers, initializer=_init_worker, initargs=(shape, out if stream is None else None)) as pool:
+            if stream is None:
+                # frames are numbered by their angle's index, so order does not matter
+                for count, _ in enumerate(pool.imap_unordered(_save, enumerate(angles), chunksize), start=1):
+                    pass
+            else:
+                # imap yields results in submission order
+                for count, data in enumerate(pool.imap(_render, angles, chunksize), start=1):
+                    stream.write(data)
+    finally:
+        if stream is not None and stream is not sys.stdout.buffer:
+            stream.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a rotating shape as frames")
+    parser.add_argument("shape", choices=SHAPES)
+    parser.add_argument("out", help="output directory for png, file or - for raw")
+    parser.add_argument("--format", choices=("png", "raw"), default="png")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--start", type=float, default=0.0, help="first angle")
+    parser.add_argument("--stop", type=float, default=2 * np.pi, help="end angle, excluded so loops are seamless")
+    parser.add_argument("--workers", type=int, default=None, help="processes, defaults to the CPU count")
+    args = parser.parse_args()
+
+    angles = np.linspace(args.start, args.stop, args.frames, endpoint=False).tolist()
+    start = time.perf_counter()
+    count = export(args.shape, angles, args.out, args.format, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"{count} frames in {elapsed:.2f}s ({count / elapsed:.1f} fps)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
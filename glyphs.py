@@ -0,0 +1,56 @@
+from functools import lru_cache
+
+import pygame as pg
+
+from dirty import points_rect
+
+# Character glyphs for the donut and the recording player. Only pygame is
+# needed, so playback can draw character cells without NumPy.
+
+FONT = ("comicsans", 30)
+
+
+class GlyphAtlas:
+    """Every ASCII character rendered once into a single surface."""
+
+    def __init__(self, font, chars, color):
+        glyphs = [font.render(char, True, color) for char in chars]
+        width = sum(glyph.get_width() for glyph in glyphs)
+        height = max(glyph.get_height() for glyph in glyphs)
+        self.surface = pg.Surface((width, height), pg.SRCALPHA)
+        self.areas = []
+        self.offsets = []  # half width and height, to center each glyph
+        x = 0
+        for glyph in glyphs:
+            w, h = glyph.get_size()
+            # the atlas starts transparent, so max blending copies the glyph as is
+            self.surface.blit(glyph, (x, 0), special_flags=pg.BLEND_RGBA_MAX)
+            self.areas.append(pg.Rect(x, 0, w, h))
+            self.offsets.append((w // 2, h // 2))
+            x += w
+        # how far any glyph reaches from its center
+        self.margin = max(max(area.size) for area in self.areas) // 2 + 1
+
+    def draw(self, surface, xs, ys, indices):
+        """Draw glyph indices centered on screen positions with one blits call.
+
+        Returns the rect covering the drawn glyphs.
+        """
+        atlas, areas, offsets = self.surface, self.areas, self.offsets
+        surface.blits(
+            [
+                (atlas, (x - offsets[i][0], y - offsets[i][1]), areas[i])
+                for x, y, i in zip(xs, ys, indices)
+            ],
+            doreturn=False,
+        )
+        return points_rect(xs, ys, self.margin)
+
+
+# built on first use, font discovery is slow
+@lru_cache(maxsize=None)
+def get_atlas(chars, color):
+    """The GlyphAtlas of chars in color, shared by every caller."""
+    if not pg.font.get_init():
+        pg.font.init()
+    return GlyphAtlas(pg.font.SysFont(*FONT), chars, color)
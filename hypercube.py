@@ -0,0 +1,203 @@
+import sys
+import pygame
+import numpy as np
+
+from dirty import DirtyRects, points_rect
+from scheduler import Scheduler
+from transform import apply, chain, homogeneous, perspective, rotation, scale
+from wireframe import WireframeRasterizer
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+DISTANCE = 2
+# a perspective step is at least this many times further from the projection
+# center than the dropped coordinate ever reaches, so w stays positive and
+# nested projections do not blow up
+DEPTH_RATIO = 2
+TURN_SAMPLES = 1024
+
+
+def hypercube_vertices(dim, edge_length=1):
+    """The 2^dim vertices as a (2^dim, dim) array, bit k of the index picks axis k's sign."""
+    index = np.arange(2**dim)[:, None]
+    bits = (index >> np.arange(dim)) & 1
+    return np.where(bits == 1, edge_length, -edge_length).astype(float)
+
+
+def hypercube_edges(dim):
+    """The edges as an (E, 2) index array of vertex pairs differing in one bit."""
+    index = np.arange(2**dim)
+    edges = []
+    for bit in range(dim):
+        low = index[(index >> bit) & 1 == 0]
+        edges.append(np.stack((low, low | (1 << bit)), axis=1))
+    return np.concatenate(edges)
+
+
+def edge_path(edges, vertex_count):
+    """A vertex sequence that walks every edge, so one polyline draws them all.
+
+    Returns an Euler circuit. Vertices of odd degree are paired up with
+    duplicate edges first, those edges are then drawn twice.
+    """
+    edges = [tuple(edge) for edge in np.asarray(edges).tolist()]
+    degree = np.bincount(np.asarray(edges).ravel(), minlength=vertex_count)
+    odd = np.flatnonzero(degree % 2).tolist()
+    edges += list(zip(odd[::2], odd[1::2]))
+
+    adjacent = [[] for _ in range(vertex_count)]
+    for number, (a, b) in enumerate(edges):
+        adjacent[a].append((b, number))
+        adjacent[b].append((a, number))
+    used = [False] * len(edges)
+    stack = [edges[0][0]]
+    path = []
+    while stack:
+        vertex = stack[-1]
+        while adjacent[vertex] and used[adjacent[vertex][-1][1]]:
+            adjacent[vertex].pop()
+        if adjacent[vertex]:
+            other, number = adjacent[vertex].pop()
+            used[number] = True
+            stack.append(other)
+        else:
+            path.append(stack.pop())
+    return np.array(path[::-1])
+
+
+def lens(dim):
+    """The (focal, depth_scale) of the perspective step dropping axis dim."""
+    return (2, 1 / 2) if dim == 3 else (1, 1)
+
+
+def perspective_steps(points, planes, distance, depth_ratio=DEPTH_RATIO, samples=TURN_SAMPLES):
+    """The (distance, focal, depth_scale) of every perspective step, by dimension.
+
+    The shape is rotated through a turn sampled at samples angles. A step keeps
+    distance unless the dropped coordinate reaches past distance / depth_ratio,
+    then it moves back to depth_ratio times the largest coordinate reached and
+    its focal length grows along, so points at depth 0 keep their size. Returns
+    the steps and the largest projected 2D coordinate over the turn.
+    """
+    if depth_ratio <= 1:
+        raise ValueError(f"depth_ratio must be above 1, got {depth_ratio}")
+    angles = np.linspace(0, 2 * np.pi, samples, endpoint=False)[:, None]
+    cos, sin = np.cos(angles), np.sin(angles)
+    points = np.repeat(points[None], samples, axis=0)
+    steps = {}
+    for dim in range(points.shape[-1], 2, -1):
+        for i, j in planes.get(dim, ()):
+            x, y = points[..., i].copy(), points[..., j]
+            points[..., i] = cos * x - sin * y
+            points[..., j] = sin * x + cos * y
+        focal, depth_scale = lens(dim)
+        dropped = depth_scale * points[..., -1]
+        step_distance = max(distance, depth_ratio * float(np.abs(dropped).max()))
+        focal *= step_distance / distance
+        steps[dim] = (step_distance, focal, depth_scale)
+        points = points[..., :-1] * (focal / (step_distance - dropped))[..., None]
+    return steps, float(np.abs(points).max())
+
+
+class Hypercube:
+    """An N-dimensional hypercube projected down to 2D.
+
+    planes maps a dimension to the rotation planes, as (axis, axis) pairs,
+    applied once the shape has been projected down to that dimension. Every
+    perspective step uses distance, or further back where the shape reaches
+    closer than distance / depth_ratio, see perspective_steps. With
+    antialias the edges are drawn by a WireframeRasterizer, otherwise with
+    pygame.draw.
+    """
+
+    def __init__(self, dim, planes, edge_length=1, distance=DISTANCE, screen_scale=100, antialias=False,
+                 depth_ratio=DEPTH_RATIO):
+        self.angle = 0
+        self.dim = dim
+        self.planes = planes
+        self.distance = distance
+        self.screen_scale = screen_scale
+        self.points = hypercube_vertices(dim, edge_length)
+        self.edges = hypercube_edges(dim)
+        self.path = edge_path(self.edges, len(self.points))
+        self.homogeneous = homogeneous(self.points)
+        # extent is the largest projected coordinate over a turn, before screen_scale
+        self.perspectives, self.extent = perspective_steps(self.points, planes, distance, depth_ratio)
+        self.rasterizer = WireframeRasterizer(WHITE) if antialias else None
+
+    def matrix(self, angle=None):
+        theta = self.angle if angle is None else angle
+        steps = []
+        for dim in range(self.dim, 2, -1):
+            for i, j in self.planes.get(dim, ()):
+                steps.append(rotation(dim, i, j, theta))
+            steps.append(perspective(dim, *self.perspectives[dim]))
+        steps.append(scale(2, self.screen_scale))
+        return chain(*steps)
+
+    def rotate(self, angle=None):
+        return apply(self.matrix(angle), self.homogeneous)
+
+    def draw(self, surface, origin):
+        return self.draw_projected(surface, self.rotate() + origin)
+
+    def draw_projected(self, surface, projected):
+        """Draw the projected vertices, return the rect that was drawn.
+
+        Vertices without an image, behind a projection center, are left out
+        together with their edges.
+        """
+        edges, path = self.edges, self.path
+        visible = np.isfinite(projected).all(axis=1)
+        if not visible.all():
+            edges = edges[visible[edges].all(axis=1)]
+            edges = (np.cumsum(visible) - 1)[edges]
+            projected = projected[visible]
+            path = None
+        if self.rasterizer is not None:
+            return self.rasterizer.draw(surface, projected, edges)
+        # draw corners
+        for coordinate in projected.tolist():
+            pygame.draw.circle(surface, WHITE, coordinate, 5)
+        # draw edges
+        if path is not None:
+            pygame.draw.lines(surface, WHITE, False, projected[path].tolist(), 1)
+        else:
+            for start, end in projected[edges].tolist():
+                pygame.draw.line(surface, WHITE, start, end, 1)
+        return points_rect(projected[:, 0], projected[:, 1], 6)
+
+
+def default_planes(dim):
+    # pairs of axes in the full dimension, plus a tumble in 3D
+    return {dim: [(i, i + 1) for i in range(0, dim - 1, 2)], 3: [(1, 2)]}
+
+
+def main(dim=5, antialias=False):
+    width, height = 800, 800
+    win = pygame.display.set_mode((width, height))
+    pygame.display.set_caption(f"Rotating {dim}D Hypercube")
+    hypercube = Hypercube(dim, default_planes(dim), antialias=antialias)
+    # fit the whole turn into the window
+    hypercube.screen_scale = 0.45 * min(width, height) / hypercube.extent
+    clock = pygame.time.Clock()
+    dirty = DirtyRects(win, BLACK)
+    scheduler = Scheduler(75)
+    angle = previous = 0
+    run = True
+    while run:
+        dirty.clear()
+        clock.tick(75)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+                sys.exit()
+        for _ in range(scheduler.advance()):
+            previous, angle = angle, angle + 0.01
+        hypercube.angle = scheduler.interpolate(previous, angle)
+        dirty.present([hypercube.draw(win, (width // 2, height // 2))])
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
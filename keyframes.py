@@ -0,0 +1,50 @@
+from collections import OrderedDict
+from math import pi
+
+import numpy as np
+
+# Keyframe cache for periodic animations. The phase is quantized into a
+# fixed number of steps per period and each step's frame is computed once,
+# after that playback is a lookup. Frames are kept in a compact dtype and the
+# least recently used are dropped once the cache grows past its memory cap.
+
+
+class KeyframeCache:
+    """Frames of a periodic animation, computed on first use per quantized phase.
+
+    compute(angle) returns the frame at angle as an array, it is stored as
+    dtype, read-only, and shared by every later lookup of the same step.
+    """
+
+    def __init__(self, compute, steps, period=2 * pi, dtype=np.float32, max_bytes=64 << 20):
+        self.compute = compute
+        self.steps = steps
+        self.period = period
+        self.dtype = dtype
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def step(self, angle):
+        """The keyframe index nearest to angle."""
+        return round(angle / self.period * self.steps) % self.steps
+
+    def __call__(self, angle):
+        step = self.step(angle)
+        frame = self.frames.get(step)
+        if frame is not None:
+            self.frames.move_to_end(step)
+            self.hits += 1
+            return frame
+        self.misses += 1
+        frame = np.asarray(self.compute(step * self.period / self.steps), dtype=self.dtype)
+        frame.flags.writeable = False
+        self.frames[step] = frame
+        self.bytes += frame.nbytes
+        # always keep the frame just computed, even when it alone is over the cap
+        while self.bytes > self.max_bytes and len(self.frames) > 1:
+            _, evicted = self.frames.popitem(last=False)
+            self.bytes -= evicted.nbytes
+        return frame
@@ -0,0 +1,98 @@
+import queue
+import threading
+import time
+
+import numpy as np
+import pygame
+
+# Pipelined rendering: a producer thread renders the next frames into
+# reusable off-screen surfaces while the main thread handles events and
+# presents the previous one. Surfaces cycle through a free queue and a
+# bounded ready queue, so the producer runs at most depth frames ahead.
+
+LATENCY_SAMPLES = 120
+
+
+class Frame:
+    """A reusable off-screen surface and what was last rendered into it."""
+
+    def __init__(self, template):
+        self.surface = pygame.Surface(template.get_size(), 0, template)
+        self.drawn = None  # rect drawn by the last render
+        self.info = None
+        self.started = 0.0
+
+
+class FramePipeline:
+    """Renders frames on a producer thread, ahead of the thread presenting them.
+
+    render(surface) draws the next frame onto a cleared off-screen surface and
+    returns the rect it drew and any info for the presenter. Surfaces get the
+    size and pixel format of template.
+    """
+
+    def __init__(self, template, render, depth=1, color=(0, 0, 0)):
+        self.render = render
+        self.color = color
+        self.free = queue.Queue()
+        # one frame being presented, one being rendered, depth waiting
+        for _ in range(depth + 2):
+            self.free.put(Frame(template))
+        self.ready = queue.Queue(maxsize=depth)
+        self.latencies = np.zeros(LATENCY_SAMPLES)
+        self.depths = np.zeros(LATENCY_SAMPLES)
+        self.count = 0
+        self.running = True
+        self.error = None
+        self.thread = threading.Thread(target=self.produce, daemon=True)
+        self.thread.start()
+
+    def produce(self):
+        try:
+            while self.running:
+                frame = self.free.get()
+                if frame is None:
+                    break
+                frame.started = time.perf_counter()
+                if frame.drawn:
+                    frame.surface.fill(self.color, frame.drawn)
+                frame.drawn, frame.info = self.render(frame.surface)
+                self.ready.put(frame)
+        except Exception as error:  # re-raised on the presenting thread
+            self.error = error
+            self.ready.put(None)
+
+    def get(self):
+        """Wait for the oldest rendered frame."""
+        self.depths[self.count % LATENCY_SAMPLES] = self.ready.qsize()
+        frame = self.ready.get()
+        if frame is None:
+            raise self.error
+        return frame
+
+    def release(self, frame):
+        """Hand a presented frame back to the producer."""
+        self.latencies[self.count % LATENCY_SAMPLES] = time.perf_counter() - frame.started
+        self.count += 1
+        self.free.put(frame)
+
+    def stats(self):
+        """Mean render-to-present latency in ms and mean ready frames, over the last frames."""
+        count = min(self.count, LATENCY_SAMPLES)
+        if count == 0:
+            return {"latency_ms": 0.0, "queue_depth": 0.0}
+        return {
+            "latency_ms": float(self.latencies[:count].mean() * 1000),
+            "queue_depth": float(self.depths[:count].mean()),
+        }
+
+    def close(self):
+        self.running = False
+        self.free.put(None)
+        # unblock a producer waiting for room in the ready queue
+        while self.thread.is_alive():
+            try:
+                self.ready.get(timeout=0.01)
+            except queue.Empty:
+                pass
+        self.thread.join()
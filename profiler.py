@@ -0,0 +1,158 @@
+import json
+import time
+
+import numpy as np
+
+# Lightweight per-frame instrumentation shared by the main loops.
+# Named spans are timed into a ring buffer, a key toggles a live frame-time
+# graph, and samples can be streamed to a CSV or JSONL file. When nothing is
+# recording, span() returns a shared no-op context so the cost is one call.
+
+MAX_SPANS = 15
+TOGGLE_KEY_NAME = "f3"
+GRAPH_HEIGHT = 100
+BUDGET_MS = 1000 / 60
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, profiler, column):
+        self.profiler = profiler
+        self.column = column
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.current[self.column] += time.perf_counter() - self.start
+        return False
+
+
+class Profiler:
+    """Times named spans of every frame into a ring buffer of the last frames."""
+
+    def __init__(self, capacity=240, stream=None):
+        self.capacity = capacity
+        self.names = []
+        self.spans = {}
+        # column 0 is the whole frame, then one column per span, in seconds
+        self.samples = np.zeros((capacity, MAX_SPANS + 1))
+        self.current = np.zeros(MAX_SPANS + 1)
+        self.count = 0
+        self.visible = False
+        self.stream = None
+        self.stream_format = None
+        self.last_frame = None
+        self.font = None
+        if stream is not None:
+            self.stream = open(stream, "w", buffering=1)  # line buffered, can be tailed
+            self.stream_format = "csv" if stream.endswith(".csv") else "jsonl"
+        self.recording = self.stream is not None
+
+    def span(self, name):
+        if not self.recording:
+            return _NULL_SPAN
+        span = self.spans.get(name)
+        if span is None:
+            if len(self.names) == MAX_SPANS:
+                raise ValueError(f"At most {MAX_SPANS} spans can be profiled")
+            self.names.append(name)
+            span = self.spans[name] = _Span(self, len(self.names))
+        return span
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.recording = self.visible or self.stream is not None
+        self.last_frame = None
+
+    def handle_event(self, event):
+        """Toggle the overlay on the profiler key, return True if the event was used."""
+        import pygame
+
+        if event.type == pygame.KEYDOWN and event.key == pygame.key.key_code(TOGGLE_KEY_NAME):
+            self.toggle()
+            return True
+        return False
+
+    def frame(self):
+        """Mark the end of a frame."""
+        if not self.recording:
+            return
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.current[0] = now - self.last_frame
+            self.samples[self.count % self.capacity] = self.current
+            if self.stream is not None:
+                self._write(self.current)
+            self.count += 1
+        self.last_frame = now
+        self.current[:] = 0
+
+    def _write(self, row):
+        values = row[: len(self.names) + 1] * 1000
+        if self.stream_format == "csv":
+            if self.count == 0:
+                self.stream.write(",".join(["frame", "frame_ms"] + [f"{name}_ms" for name in self.names]) + "\n")
+            self.stream.write(",".join([str(self.count)] + [f"{value:.4f}" for value in values]) + "\n")
+        else:
+            record = {"frame": self.count, "frame_ms": round(values[0], 4)}
+            record.update((f"{name}_ms", round(value, 4)) for name, value in zip(self.names, values[1:]))
+            self.stream.write(json.dumps(record) + "\n")
+
+    def recent(self):
+        """The recorded frames in order, oldest first, in milliseconds."""
+        if self.count < self.capacity:
+            return self.samples[: self.count] * 1000
+        start = self.count % self.capacity
+        return np.roll(self.samples, -start, axis=0) * 1000
+
+    def draw(self, surface, position=(10, 10)):
+        """Draw the frame-time graph and per-span breakdown when visible."""
+        if not self.visible:
+            return None
+        import pygame
+
+        if self.font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self.font = pygame.font.Font(None, 18)
+        samples = self.recent()
+        lines = []
+        if len(samples):
+            lines.append(f"frame {samples[:, 0].mean():5.2f} ms  max {samples[:, 0].max():5.2f}")
+            means = samples[:, 1 : len(self.names) + 1].mean(axis=0)
+            lines += [f"{name:10s} {mean:5.2f} ms" for name, mean in zip(self.names, means)]
+        x, y = position
+        panel = pygame.Rect(x, y, self.capacity + 150, max(GRAPH_HEIGHT, 14 * len(lines) + 4))
+        surface.fill((20, 20, 20), panel)
+
+        # one pixel per frame, the budget line at 60 FPS is a third of the way up
+        scale = GRAPH_HEIGHT / (3 * BUDGET_MS)
+        budget_y = y + GRAPH_HEIGHT - BUDGET_MS * scale
+        pygame.draw.line(surface, (90, 90, 0), (x, budget_y), (x + self.capacity, budget_y))
+        if len(samples) > 1:
+            heights = np.minimum(samples[:, 0] * scale, GRAPH_HEIGHT)
+            points = np.stack((x + np.arange(len(samples)), y + GRAPH_HEIGHT - heights), axis=1)
+            pygame.draw.lines(surface, (0, 255, 0), False, points.tolist())
+
+        for number, line in enumerate(lines):
+            text = self.font.render(line, True, (255, 255, 255))
+            surface.blit(text, (x + self.capacity + 5, y + 2 + number * 14))
+        return panel
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
@@ -0,0 +1,391 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import pygame
+
+import shapes
+from dirty import DirtyRects, points_rect
+from glyphs import get_atlas
+
+# Recorded playback. A recording holds a header with JSON metadata, the
+# frame payloads and an index of where every payload starts, in one file
+# that the player memory-maps, so any frame is found without reading the
+# others. A frame is a fixed number of bytes: int16 screen points, one byte
+# per character cell or one palette index per pixel. Every keyframe_interval
+# frames one is stored whole, PackBits run-length encoded, the ones between
+# keep only the spans of bytes that changed since the frame before. Decoding
+# is byte slicing and repetition and drawing is pygame only, so playback
+# never imports NumPy, which is only needed to record.
+
+MAGIC = b"RSRC"
+VERSION = 1
+KEYFRAME_INTERVAL = 30
+
+# magic, version, keyframe interval, frames, bytes per frame, index offset, metadata length
+HEADER = struct.Struct("<4sHHIIQI")
+INDEX_ENTRY = struct.Struct("<QI")  # payload offset and length
+SPAN = struct.Struct("<II")  # where a changed span starts in the frame, its packed length
+
+# PackBits: header byte n < 128 is followed by n + 1 literal bytes, n >= 128
+# by one byte repeated n - 125 times
+MAX_LITERAL = 128
+MIN_RUN = 3
+MAX_RUN = 130
+RUN_OFFSET = MAX_LITERAL - MIN_RUN  # header byte of a run is its length + RUN_OFFSET
+MERGE_GAP = 8  # changed spans closer than this are stored as one
+
+SHAPES = shapes.SHAPES
+
+
+def pack_bits(data):
+    """PackBits encode a 1D uint8 array, see unpack_bits."""
+    import numpy as np
+
+    raw = data.tobytes()
+    out = bytearray()
+    if not raw:
+        return bytes(out)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(data)) + 1))
+    lengths = np.diff(np.append(starts, len(raw)))
+    literal = None  # start of the bytes waiting to go out as literals
+
+    def flush(end):
+        for start in range(literal, end, MAX_LITERAL):
+            count = min(MAX_LITERAL, end - start)
+            out.append(count - 1)
+            out.extend(raw[start:start + count])
+
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        if length < MIN_RUN:
+            if literal is None:
+                literal = start
+            continue
+        if literal is not None:
+            flush(start)
+            literal = None
+        while length >= MIN_RUN:
+            count = min(length, MAX_RUN)
+            out += bytes((count + RUN_OFFSET, raw[start]))
+            start += count
+            length -= count
+        if length:
+            literal = start
+    if literal is not None:
+        flush(len(raw))
+    return bytes(out)
+
+
+def encode_delta(previous, frame):
+    """The spans of frame that differ from previous, each as SPAN and its PackBits bytes."""
+    import numpy as np
+
+    changed = np.flatnonzero(previous != frame)
+    out = bytearray()
+    if not changed.size:
+        return bytes(out)
+    breaks = np.flatnonzero(np.diff(changed) > MERGE_GAP)
+    starts = changed[np.concatenate(([0], breaks + 1))]
+    ends = changed[np.append(breaks, changed.size - 1)] + 1
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        packed = pack_bits(frame[start:end])
+        out += SPAN.pack(start, len(packed))
+        out += packed
+    return bytes(out)
+
+
+def unpack_bits(data, start, end, out, position):
+    """Decode the PackBits bytes data[start:end] into out at position, return the position after them."""
+    while start < end:
+        n = data[start]
+        if n < MAX_LITERAL:
+            count = n + 1
+            out[position:position + count] = data[start + 1:start + 1 + count]
+            start += count + 1
+        else:
+            count = n - RUN_OFFSET
+            out[position:position + count] = bytes((data[start + 1],)) * count
+            start += 2
+        position += count
+    return position
+
+
+class RecordingWriter:
+    """Writes frames of frame_bytes bytes to a new recording at path.
+
+    meta is stored as JSON, the player picks how to draw a frame by its
+    "kind". The file only appears under path once closed.
+    """
+
+    def __init__(self, path, meta, frame_bytes, keyframe_interval=KEYFRAME_INTERVAL):
+        self.path = path
+        self.partial = path + ".partial"
+        self.meta = json.dumps(meta).encode()
+        self.frame_bytes = frame_bytes
+        self.keyframe_interval = keyframe_interval
+        self.index = []
+        self.previous = None
+        self.file = open(self.partial, "wb")
+        self.file.write(self.header(0, 0))
+
+    def header(self, frames, index_offset):
+        return HEADER.pack(
+            MAGIC, VERSION, self.keyframe_interval, frames, self.frame_bytes, index_offset, len(self.meta)
+        ) + self.meta
+
+    def write(self, frame):
+        """Append a frame, any array of frame_bytes bytes in total."""
+        import numpy as np
+
+        frame = np.ascontiguousarray(frame).reshape(-1).view(np.uint8)
+        if frame.size != self.frame_bytes:
+            raise ValueError(f"Frame has {frame.size} bytes, expected {self.frame_bytes}")
+        if len(self.index) % self.keyframe_interval == 0:
+            payload = pack_bits(frame)
+        else:
+            payload = encode_delta(self.previous, frame)
+        self.index.append((self.file.tell(), len(payload)))
+        self.file.write(payload)
+        self.previous = frame.copy()
+
+    def close(self):
+        index_offset = self.file.tell()
+        for entry in self.index:
+            self.file.write(INDEX_ENTRY.pack(*entry))
+        self.file.seek(0)
+        self.file.write(self.header(len(self.index), index_offset))
+        self.file.close()
+        os.replace(self.partial, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        if error is None:
+            self.close()
+        else:
+            self.file.close()
+            os.remove(self.partial)
+
+
+class Recording:
+    """A memory-mapped recording, read one frame at a time.
+
+    Reading frame n decodes its keyframe and the deltas up to n, or only the
+    deltas after the frame read last when that is on the way, so playing in
+    order decodes one payload per frame.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.keyframe_interval, self.frames, self.frame_bytes, self.index_offset, meta_length = (
+            HEADER.unpack_from(self.data)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} recording")
+        self.meta = json.loads(self.data[HEADER.size:HEADER.size + meta_length])
+        self.frame = bytearray(self.frame_bytes)
+        self.current = None  # number of the frame held in self.frame
+
+    def __len__(self):
+        return self.frames
+
+    def decode(self, number):
+        """Apply the payload of frame number to self.frame."""
+        start, length = INDEX_ENTRY.unpack_from(self.data, self.index_offset + number * INDEX_ENTRY.size)
+        end = start + length
+        if number % self.keyframe_interval == 0:
+            unpack_bits(self.data, start, end, self.frame, 0)
+            return
+        while start < end:
+            position, length = SPAN.unpack_from(self.data, start)
+            start += SPAN.size
+            unpack_bits(self.data, start, start + length, self.frame, position)
+            start += length
+
+    def read(self, number):
+        """Return frame number as a bytearray, overwritten by the next read."""
+        if not 0 <= number < self.frames:
+            raise IndexError(f"Frame {number} out of range, the recording has {self.frames}")
+        keyframe = number - number % self.keyframe_interval
+        if self.current is not None and keyframe <= self.current <= number:
+            first = self.current + 1
+        else:
+            first = keyframe
+        for step in range(first, number + 1):
+            self.decode(step)
+        self.current = number
+        return self.frame
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def palette_indices(pixels, palette):
+    """Index into palette of every (..., 3) pixel color, a ValueError for colors not in it."""
+    import numpy as np
+
+    weights = np.array([1 << 16, 1 << 8, 1])
+    keys = np.asarray(palette, dtype=np.int64) @ weights
+    order = np.argsort(keys)
+    pixel_keys = pixels.astype(np.int64) @ weights
+    found = np.clip(np.searchsorted(keys, pixel_keys, sorter=order), 0, len(keys) - 1)
+    if not (keys[order[found]] == pixel_keys).all():
+        raise ValueError("Frame has colors that are not in the palette")
+    return order[found].astype(np.uint8)
+
+
+def make_source(shape):
+    """Return (meta, frame) where frame(angle) is the shape's frame as an array."""
+    import numpy as np
+
+    source = shapes.make(shape)
+    width, height = source.size
+    if shape in ("cube", "tesseract"):
+        instance = source.instance
+        meta = {
+            "kind": "points", "size": [width, height], "origin": list(source.origin),
+            "edges": instance.edges.tolist(), "color": list(source.color),
+        }
+        return meta, lambda angle: np.rint(instance.rotate(angle)).astype("<i2")
+
+    if shape == "donut":
+        meta = {
+            "kind": "cells", "size": [width, height], "columns": source.columns,
+            "cell": list(source.cell), "chars": source.chars, "color": list(source.color),
+        }
+        # 0 for an empty cell, glyph index + 1 otherwise
+        return meta, lambda phi: (source.shade(phi) + 1).astype(np.uint8)
+
+    renderer = source.renderer
+    palette = np.concatenate(([(0, 0, 0)], renderer.palette))
+    meta = {"kind": "pixels", "size": [width, height], "palette": palette.tolist()}
+
+    def frame(angle):
+        pixels = np.zeros((width, height, 3), dtype=np.uint8)
+        renderer.rasterize(pixels, source.vertices, source.texels, angle)
+        return palette_indices(pixels, palette).T  # rows of pixels
+
+    return meta, frame
+
+
+def record(shape, path, angles, fps=60, keyframe_interval=KEYFRAME_INTERVAL):
+    """Record the shape at every angle to path, return the file size in bytes."""
+    meta, frame = make_source(shape)
+    meta["fps"] = fps
+    first = frame(angles[0])
+    with RecordingWriter(path, meta, first.nbytes, keyframe_interval) as writer:
+        writer.write(first)
+        for angle in angles[1:]:
+            writer.write(frame(angle))
+    return os.path.getsize(path)
+
+
+def draw_points(surface, meta, frame):
+    coordinates = array("h", frame)
+    if sys.byteorder == "big":
+        coordinates.byteswap()
+    origin_x, origin_y = meta["origin"]
+    xs = [x + origin_x for x in coordinates[::2]]
+    ys = [y + origin_y for y in coordinates[1::2]]
+    color = meta["color"]
+    for a, b in meta["edges"]:
+        pygame.draw.line(surface, color, (xs[a], ys[a]), (xs[b], ys[b]))
+    for x, y in zip(xs, ys):
+        pygame.draw.circle(surface, color, (x, y), 5)
+    return points_rect(xs, ys, 6)
+
+
+def draw_cells(surface, meta, frame):
+    glyphs = get_atlas(meta["chars"], tuple(meta["color"]))
+    columns = meta["columns"]
+    cell_width, cell_height = meta["cell"]
+    cells = [cell for cell, value in enumerate(frame) if value]
+    return glyphs.draw(
+        surface,
+        [(cell % columns + 0.5) * cell_width for cell in cells],
+        [(cell // columns + 0.5) * cell_height for cell in cells],
+        [frame[cell] - 1 for cell in cells],
+    )
+
+
+def draw_pixels(surface, meta, frame):
+    image = pygame.image.frombuffer(frame, meta["size"], "P")
+    image.set_palette(meta["palette"])
+    return surface.blit(image, (0, 0))
+
+
+# Frame drawing by recording kind, each returns the rect it drew
+DRAWERS = {"points": draw_points, "cells": draw_cells, "pixels": draw_pixels}
+
+
+def play(path, fps=None, loop=True):
+    """Play a recording in a window, LEFT and RIGHT seek by a keyframe interval."""
+    with Recording(path) as recording:
+        meta = recording.meta
+        draw = DRAWERS[meta["kind"]]
+        screen = pygame.display.set_mode(meta["size"])
+        pygame.display.set_caption(f"Playing {os.path.basename(path)}")
+        clock = pygame.time.Clock()
+        dirty = DirtyRects(screen)
+        number = 0
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+                if event.type == pygame.KEYDOWN:
+                    if event.key in (pygame.K_q, pygame.K_ESCAPE):
+                        return
+                    if event.key == pygame.K_RIGHT:
+                        number = (number + recording.keyframe_interval) % len(recording)
+                    elif event.key == pygame.K_LEFT:
+                        number = (number - recording.keyframe_interval) % len(recording)
+            dirty.clear()
+            dirty.present([draw(screen, meta, recording.read(number))])
+            clock.tick(fps or meta["fps"])
+            number += 1
+            if number == len(recording):
+                if not loop:
+                    return
+                number = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a rotating shape, or play a recording back")
+    commands = parser.add_subparsers(dest="command", required=True)
+    recorder = commands.add_parser("record", help="record one turn of a shape")
+    recorder.add_argument("shape", choices=SHAPES)
+    recorder.add_argument("out")
+    recorder.add_argument("--frames", type=int, default=240)
+    recorder.add_argument("--fps", type=int, default=60, help="playback rate stored in the recording")
+    recorder.add_argument("--keyframe-interval", type=int, default=KEYFRAME_INTERVAL)
+    player = commands.add_parser("play", help="play a recording")
+    player.add_argument("recording")
+    player.add_argument("--fps", type=int, help="override the recorded rate")
+    player.add_argument("--once", action="store_true", help="stop at the end instead of looping")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        from math import pi
+
+        angles = [2 * pi * frame / args.frames for frame in range(args.frames)]
+        size = record(args.shape, args.out, angles, args.fps, args.keyframe_interval)
+        print(f"{args.frames} frames, {size} bytes", file=sys.stderr)
+    else:
+        play(args.recording, args.fps, loop=not args.once)
+
+
+if __name__ == "__main__":
+    main()
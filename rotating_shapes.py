@@ -0,0 +1,84 @@
+import time
+
+START = time.perf_counter()
+
+import argparse  # noqa: E402
+import importlib  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
+
+# Single entry point for every demo: python -m rotating_shapes <shape>.
+# Only the chosen backend's module is imported, pygame subsystems and fonts
+# are initialized by its main loop when first needed, and the time to the
+# first presented frame is reported on stderr.
+
+SHAPES = ("cube", "tesseract", "hypercube", "donut", "earth", "scene")
+BACKENDS = ("pygame", "terminal")
+
+
+def on_first_call(owner, name, callback):
+    """Call callback once, after the first call of owner.name."""
+    original = getattr(owner, name)
+
+    def first(*args, **kwargs):
+        setattr(owner, name, original)
+        result = original(*args, **kwargs)
+        callback()
+        return result
+
+    setattr(owner, name, first)
+
+
+def report(stage, stream=sys.stderr):
+    print(f"{stage} {(time.perf_counter() - START) * 1000:8.1f} ms after start", file=stream, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="rotating_shapes", description="Run one of the rotating shape demos")
+    parser.add_argument("shape", choices=SHAPES)
+    parser.add_argument("--backend", choices=BACKENDS, default="pygame", help="terminal is only available for donut")
+    parser.add_argument("--profile", help="stream per-frame timings to a .csv or .jsonl file")
+    parser.add_argument("--texture", help="earth texture: .npy, .pbm, .pgm, .ppm, or raw .rgb/.raw named like world.WxH.rgb")
+    parser.add_argument("--dim", type=int, default=5, help="hypercube dimension")
+    parser.add_argument("--antialias", action="store_true", help="hypercube: anti-aliased edges, slower")
+    parser.add_argument("--keyframes", type=int, help="cache this many keyframes per turn, cube, tesseract and donut")
+    parser.add_argument("--workers", type=int, help="earth: render in bands on this many threads")
+    parser.add_argument("--band-height", type=int, default=64, help="earth: rows per band with --workers")
+    parser.add_argument("--pipeline", action="store_true", help="donut, earth: render ahead on a thread")
+    parser.add_argument("--quiet", action="store_true", help="do not report startup times")
+    args = parser.parse_args()
+    if args.backend == "terminal" and args.shape != "donut":
+        parser.error("the terminal backend only renders the donut")
+
+    # the terminal draws on stdout, so reports go after the first frame on stderr
+    if args.backend == "terminal":
+        import donut_terminal
+
+        if not args.quiet:
+            report("imported")
+            on_first_call(donut_terminal.TerminalRenderer, "draw", lambda: report("first frame"))
+        donut_terminal.main(max_fps=30)
+        return
+
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    module = importlib.import_module(args.shape)
+    if not args.quiet:
+        import pygame
+
+        report("imported")
+        on_first_call(pygame.display, "update", lambda: report("first frame"))
+    if args.shape == "hypercube":
+        module.main(args.dim, antialias=args.antialias)
+    elif args.shape == "earth":
+        module.main(args.texture, profile=args.profile, workers=args.workers, band_height=args.band_height,
+                    pipelined=args.pipeline)
+    elif args.shape == "scene":
+        module.main(profile=args.profile)
+    elif args.shape == "donut":
+        module.main(profile=args.profile, keyframes=args.keyframes, pipelined=args.pipeline)
+    else:
+        module.main(profile=args.profile, keyframes=args.keyframes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import sys
+
+import numpy as np
+import pygame
+
+import earth
+import torus
+from cube import Cube
+from dirty import DirtyRects
+from profiler import Profiler
+from scheduler import Scheduler
+from tesseract import Tesseract
+from transform import apply
+
+# Many rotating shapes in one window. Objects of the same shape and level of
+# detail share one vertex buffer and are transformed together with one stacked
+# matmul, then every point of the scene is depth tested and written in a
+# single pass and every wireframe edge is rasterized in another. Point shapes
+# pick their mesh from each object's radius in pixels, so small objects do not
+# transform points that land on the same pixels.
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+CORNER_RADIUS = 5
+# Largest gaps in pixels between neighbouring torus points along the outer
+# ring and between the latitude rings of a sphere's points
+TORUS_GAP = 3.5
+RING_GAP = 9
+
+
+class Wireframe:
+    """Scene shape of a hypercube, drawn as edges and corner dots."""
+
+    def __init__(self, hypercube, color=WHITE):
+        self.hypercube = hypercube
+        self.path = hypercube.path
+        self.color = color
+        angles = np.linspace(0, 2 * np.pi, 16, endpoint=False)
+        self.extent = np.abs(self.transform(angles)[0]).max()
+
+    def select(self, radius):
+        return 0  # edges cost the same at any size
+
+    def transform(self, angles, level=0):
+        """Return the (K, N, 2) screen offsets of the vertices for K angles."""
+        matrices = np.stack([self.hypercube.matrix(angle) for angle in angles])
+        return apply(matrices, self.hypercube.homogeneous), None, None
+
+
+class Torus:
+    """Scene shape of the donut, drawn as points shaded by their lighting.
+
+    Like donut.spacings, each level spaces the points further apart. An object
+    uses the coarsest level that keeps TORUS_GAP at its radius.
+    """
+
+    def __init__(self, the_spacing=0.1, phi_spacing=0.05, color=(200, 200, 200), factors=(1, 1.5, 2, 3, 4)):
+        self.spacings = [(the_spacing * factor, phi_spacing * factor) for factor in factors]
+        self.meshes = {}  # built on first use
+        self.color = np.array(color)
+        self.extent = torus.k1 * (torus.r1 + torus.r2) / (torus.k2 - torus.r1 - torus.r2)
+
+    def select(self, radius):
+        """Return the level for a torus of radius pixels."""
+        level = 0
+        while level + 1 < len(self.spacings) and self.spacings[level + 1][1] * radius <= TORUS_GAP:
+            level += 1
+        return level
+
+    def mesh(self, level):
+        """Return the (points, normals) of a level."""
+        if level not in self.meshes:
+            self.meshes[level] = torus.get_torus_and_normal(*self.spacings[level])
+        return self.meshes[level]
+
+    def transform(self, angles, level=0):
+        """Return the screen offsets, depths and colors of the points for K angles."""
+        points, normals = self.mesh(level)
+        matrices = np.stack([torus.rotate_z(torus.rotate_x(np.eye(3), angle), angle) for angle in angles])
+        rotated = points @ matrices
+        light = (normals @ matrices) @ torus.light_dir / torus.len_light_vec
+        scale = torus.k1 / (torus.k2 + rotated[..., 2])
+        # screen y grows downwards, the donut's y grows upwards
+        offsets = np.stack((scale * rotated[..., 0], -scale * rotated[..., 1]), axis=-1)
+        # unlit points are culled, the depth of a point is its z
+        depth = np.where(light > 0, rotated[..., 2], np.inf)
+        colors = (np.clip(light, 0, 1)[..., None] * self.color).astype(np.uint8)
+        return offsets, depth, colors
+
+
+class Sphere:
+    """Scene shape of the Earth, drawn as points colored by land and water.
+
+    The meshes are the earth.SphereLOD levels of earth.main, without the
+    coarsest whose dozen rings no longer read as a globe. SphereLOD.select
+    only keeps the density along the equator, so an object uses the coarsest
+    level that keeps RING_GAP instead.
+    """
+
+    def __init__(self, radius=earth.RADIUS, base_resolution_theta=earth.BASE_RESOLUTION_THETA,
+                 base_resolution_phi=earth.BASE_RESOLUTION_PHI, levels=3, bitmap=earth.WORLD_BITMAP):
+        self.lod = earth.SphereLOD(
+            radius, base_resolution_theta, base_resolution_phi, levels, bitmap, cache_dir=earth.default_cache_dir()
+        )
+        self.palette = np.array([earth.WATER_COLORS[0], earth.LAND_COLORS[0]], dtype=np.uint8)
+        self.extent = radius
+
+    def select(self, radius):
+        """Return the level for a globe of radius pixels."""
+        level = 0
+        while level + 1 < len(self.lod.levels) and np.pi * radius / self.lod.levels[level + 1][1] <= RING_GAP:
+            level += 1
+        return level
+
+    def transform(self, angles, level=0):
+        """Return the screen offsets, depths and colors of the vertices for K angles."""
+        vertices, texels = self.lod.mesh(level)
+        cos_a, sin_a = np.cos(angles)[:, None], np.sin(angles)[:, None]
+        x, y, z = vertices.T
+        rotated_x = x * cos_a + z * sin_a
+        rotated_z = -x * sin_a + z * cos_a
+        offsets = np.stack((rotated_x, np.broadcast_to(y, rotated_x.shape)), axis=-1)
+        # the back hemisphere is culled
+        depth = np.where(rotated_z < 0, rotated_z, np.inf)
+        return offsets, depth, np.broadcast_to(self.palette[texels], offsets.shape[:2] + (3,))
+
+
+def segment_pixels(start, end):
+    """Return the pixels along many segments at once, as an (M, 2) int array."""
+    delta = end - start
+    steps = np.abs(delta).max(axis=1).astype(np.int64) + 1
+    owner = np.repeat(np.arange(len(start)), steps)
+    step = np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)
+    t = step / np.maximum(steps - 1, 1)[owner]
+    return np.rint(start[owner] + delta[owner] * t[:, None]).astype(np.int64)
+
+
+def disc_offsets(radius):
+    span = np.arange(-radius, radius + 1)
+    x, y = np.meshgrid(span, span, indexing="ij")
+    inside = x * x + y * y <= radius * radius
+    return np.stack((x[inside], y[inside]), axis=1)
+
+
+class SceneObject:
+    def __init__(self, shape, position, radius, speed=1.0):
+        self.shape = shape
+        self.position = position
+        self.scale = radius / shape.extent
+        self.level = shape.select(radius)
+        self.speed = speed
+        self.angle = self.previous = 0.0
+
+
+class Scene:
+    """Objects sharing shape buffers, rendered in one batched pass per frame."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.objects = []
+        # generic scatter-min depth test over the whole window
+        self.depth = earth.EarthRenderer(width, height)
+        self.corner = disc_offsets(CORNER_RADIUS)
+
+    def add(self, shape, position, radius, speed=1.0):
+        """Place a shape with its center at position, scaled to radius pixels."""
+        obj = SceneObject(shape, position, radius, speed)
+        self.objects.append(obj)
+        return obj
+
+    def step(self, angle):
+        """Advance every object by one fixed step of angle times its speed."""
+        for obj in self.objects:
+            obj.previous = obj.angle
+            obj.angle += angle * obj.speed
+
+    def groups(self):
+        shapes = {}
+        for obj in self.objects:
+            shapes.setdefault((id(obj.shape), obj.level), (obj.shape, obj.level, []))[2].append(obj)
+        return shapes.values()
+
+    def transform(self, alpha=1.0):
+        """Transform all objects, grouped by shape and level.
+
+        Returns the points as screen x, y, depth and colors, and the
+        wireframes as (vertices, path, color) per shape.
+        """
+        points, wires = [], []
+        for shape, level, objects in self.groups():
+            angles = np.array([obj.previous + (obj.angle - obj.previous) * alpha for obj in objects])
+            scales = np.array([obj.scale for obj in objects])
+            positions = np.array([obj.position for obj in objects], dtype=float)
+            offsets, depth, colors = shape.transform(angles, level)
+            screen = offsets * scales[:, None, None] + positions[:, None, :]
+            if depth is None:
+                wires.append((screen, shape.path, shape.color))
+            else:
+                points.append((screen.reshape(-1, 2), (depth * scales[:, None]).ravel(), colors.reshape(-1, 3)))
+        return points, wires
+
+    def render(self, surface, alpha=1.0):
+        """Draw every object onto surface, return the rect that was drawn."""
+        points, wires = self.transform(alpha)
+        pixels = pygame.surfarray.pixels3d(surface)
+        drawn = []
+        if points:
+            screen, depth, colors = (np.concatenate(part) for part in zip(*points))
+            x, y = np.floor(screen).astype(np.int64).T
+            index = np.flatnonzero(
+                np.isfinite(depth) & (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+            )
+            winners = index[self.depth.resolve(x[index], y[index], depth[index])]
+            pixels[x[winners], y[winners]] = colors[winners]
+            drawn.append(self.depth.written())
+        for screen, path, color in wires:
+            edges = screen[:, path]
+            lines = segment_pixels(edges[:, :-1].reshape(-1, 2), edges[:, 1:].reshape(-1, 2))
+            corners = (np.rint(screen).astype(np.int64).reshape(-1, 1, 2) + self.corner).reshape(-1, 2)
+            x, y = np.concatenate((lines, corners)).T
+            inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+            x, y = x[inside], y[inside]
+            pixels[x, y] = color
+            if x.size:
+                drawn.append(pygame.Rect(x.min(), y.min(), x.max() + 1 - x.min(), y.max() + 1 - y.min()))
+        del pixels
+        drawn = [rect for rect in drawn if rect]
+        return drawn[0].unionall(drawn[1:]) if drawn else None
+
+
+def grid_scene(width, height, columns, rows):
+    """A scene of columns x rows objects cycling through every shape."""
+    scene = Scene(width, height)
+    shapes = [Wireframe(Cube()), Wireframe(Tesseract()), Torus(), Sphere()]
+    cell_width, cell_height = width / columns, height / rows
+    radius = 0.45 * min(cell_width, cell_height)
+    for number in range(columns * rows):
+        row, column = divmod(number, columns)
+        position = ((column + 0.5) * cell_width, (row + 0.5) * cell_height)
+        scene.add(shapes[number % len(shapes)], position, radius, speed=1 + 0.1 * (number % 7))
+    return scene
+
+
+def main(columns=4, rows=3, profile=None):
+    width, height = 1200, 900
+    win = pygame.display.set_mode((width, height))
+    pygame.display.set_caption("Rotating Shapes")
+    scene = grid_scene(width, height, columns, rows)
+    clock = pygame.time.Clock()
+    profiler = Profiler(stream=profile)
+    dirty = DirtyRects(win, BLACK)
+    scheduler = Scheduler(60)
+    run = True
+    while run:
+        dirty.clear()
+        with profiler.span("tick"):
+            clock.tick(60)
+        with profiler.span("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    run = False
+                profiler.handle_event(event)
+        with profiler.span("update"):
+            for _ in range(scheduler.advance()):
+                scene.step(0.01)
+        with profiler.span("raster"):
+            drawn = scene.render(win, scheduler.alpha)
+        with profiler.span("overlay"):
+            overlay = profiler.draw(win)
+        with profiler.span("flip"):
+            dirty.present([drawn, overlay])
+        profiler.frame()
+    profiler.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
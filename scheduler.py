@@ -0,0 +1,67 @@
+import time
+
+# Fixed-timestep animation shared by the main loops. The simulation advances
+# in steps of a fixed length taken from wall-clock time, independent of how
+# often frames are rendered, and frames draw the state interpolated between
+# the last two steps. Slow machines take several steps per frame, so shapes
+# turn at the same speed everywhere.
+
+
+class Scheduler:
+    """Turns elapsed wall-clock time into a whole number of fixed steps."""
+
+    def __init__(self, rate, max_steps=8, timer=time.perf_counter):
+        self.step = 1 / rate
+        self.max_steps = max_steps
+        self.timer = timer
+        self.accumulator = 0.0
+        self.last = None
+
+    def advance(self):
+        """Return the number of steps due since the last call.
+
+        After a stall of more than max_steps the remaining time is dropped,
+        so the animation skips ahead instead of spiralling to catch up.
+        """
+        now = self.timer()
+        if self.last is None:
+            self.last = now
+            return 0
+        self.accumulator += now - self.last
+        self.last = now
+        steps = int(self.accumulator // self.step)
+        if steps > self.max_steps:
+            self.accumulator %= self.step
+            return self.max_steps
+        self.accumulator -= steps * self.step
+        return steps
+
+    @property
+    def alpha(self):
+        """How far the current time is between the last step and the next, 0 to 1."""
+        return self.accumulator / self.step
+
+    def interpolate(self, previous, current):
+        return previous + (current - previous) * self.alpha
+
+
+class AdaptiveQuality:
+    """A level of detail that coarsens while frames are over budget.
+
+    Level 0 is the finest. The level goes up by one for every frame over
+    budget, and back down by one for every frame under half the budget.
+    """
+
+    def __init__(self, levels, budget_ms=1000 / 60):
+        self.levels = levels
+        self.budget_ms = budget_ms
+        self.level = 0
+
+    def update(self, frame_ms):
+        """Record how long the last frame took, return the level to use."""
+        if frame_ms is not None:
+            if frame_ms > self.budget_ms:
+                self.level = min(self.level + 1, self.levels - 1)
+            elif frame_ms < self.budget_ms / 2:
+                self.level = max(self.level - 1, 0)
+        return self.level
@@ -0,0 +1,85 @@
+# Shape setup shared by the offline tools, bench.py, export.py and
+# recording.py. Each class builds what a shape's main loop shows at startup,
+# the window size and the object it draws, so the tools stay in step with the
+# interactive windows. The tools then drive the object their own way: export
+# draws whole frames, recording reads the raw state, bench times the stages.
+
+SHAPES = ("cube", "tesseract", "donut", "earth")
+
+
+class Wireframe:
+    """The cube or the tesseract, with its module's window constants."""
+
+    def __init__(self, name):
+        if name == "cube":
+            import cube as module
+
+            self.instance = module.Cube()
+        else:
+            import tesseract as module
+
+            self.instance = module.Tesseract()
+        self.module = module
+        self.size = (module.WIDTH, module.HEIGHT)
+        self.origin = (module.ORIGIN_X, module.ORIGIN_Y)
+        self.background = module.BLACK
+        self.color = module.WHITE
+
+    def draw(self, surface, angle):
+        surface.fill(self.background)
+        self.instance.angle = angle
+        self.instance.draw(surface)
+
+
+class Donut:
+    """The donut's character grid at its finest spacing."""
+
+    def __init__(self):
+        import donut
+
+        self.donut = donut
+        self.size = (donut.width, donut.height)
+        self.columns, self.rows = donut.grid_columns, donut.grid_rows
+        self.cell = (donut.cell_width, donut.cell_height)
+        self.chars = donut.ASCII
+        self.background = donut.black
+        self.color = donut.white
+        self.spacing = donut.spacings[0]
+        self.shade = donut.grid_shader(self.spacing)  # phi to the grid of glyph indices, -1 for empty
+
+    def draw(self, surface, phi):
+        surface.fill(self.background)
+        self.donut.update_grid(phi, surface, self.spacing)
+
+
+class Earth:
+    """The globe earth.main shows at startup, at the level it picks for zoom 1."""
+
+    def __init__(self, workers=None):
+        import earth
+
+        self.size = (earth.WIDTH, earth.HEIGHT)
+        self.radius = earth.RADIUS
+        self.lod = earth.SphereLOD(
+            earth.RADIUS, earth.BASE_RESOLUTION_THETA, earth.BASE_RESOLUTION_PHI, cache_dir=earth.default_cache_dir()
+        )
+        self.level = self.lod.select(self.radius)
+        self.vertices, self.texels = self.lod.mesh(self.level)
+        if workers:
+            self.renderer = earth.TiledEarthRenderer(*self.size, workers)
+        else:
+            self.renderer = earth.EarthRenderer(*self.size)
+
+    def draw(self, surface, angle):
+        self.renderer.render(self.vertices, self.texels, surface, angle)
+
+
+def make(name, **options):
+    """Return the shape called name, see SHAPES."""
+    if name in ("cube", "tesseract"):
+        return Wireframe(name)
+    if name == "donut":
+        return Donut()
+    if name == "earth":
+        return Earth(**options)
+    raise ValueError(f"Unknown shape '{name}', expected one of {', '.join(SHAPES)}")
@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Streaming access to large equirectangular textures. The source stays a
+# memory map, texels are copied out of it one square tile at a time on first
+# use and kept in a least recently used cache of bounded size, so memory use
+# does not depend on the texture size and nothing is read up front. Mipmap
+# level k samples every 2^k-th texel of the source, nearest neighbour. The
+# cache is shared by the threads of a TiledEarthRenderer and guarded by a lock,
+# tiles are read from the source outside of it.
+
+
+class StreamingTexture:
+    """A (height, width) palette-indexed or (height, width, 3) RGB texture read in tiles.
+
+    Indexed texels are clipped to the last palette entry, so a two-color
+    palette maps 0 to the first color and everything else to the second.
+    """
+
+    def __init__(self, source, palette=None, tile=256, max_bytes=64 << 20, levels=None):
+        if source.ndim == 2 and palette is None:
+            raise ValueError("A palette is needed for an indexed texture")
+        self.source = source
+        self.palette = None if palette is None else np.asarray(palette, dtype=np.uint8)
+        self.tile = tile
+        self.max_bytes = max_bytes
+        self.height, self.width = source.shape[:2]
+        if levels is None:
+            # down to a level that fits in a single tile
+            levels = max(1, int(np.ceil(np.log2(max(self.width, self.height) / tile))) + 1)
+        self.levels = levels
+        self.tiles = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def level_for(self, samples):
+        """The coarsest level with at least samples texels around the equator."""
+        if samples <= 0:
+            return self.levels - 1
+        level = int(np.floor(np.log2(max(self.width / samples, 1))))
+        return min(level, self.levels - 1)
+
+    def level_size(self, level):
+        step = 1 << level
+        return -(-self.height // step), -(-self.width // step)
+
+    def load_tile(self, level, row, column):
+        key = (level, row, column)
+        with self.lock:
+            tile = self.tiles.get(key)
+            if tile is not None:
+                self.tiles.move_to_end(key)
+                return tile
+        step = 1 << level
+        size = self.tile * step
+        y0, x0 = row * size, column * size
+        tile = np.array(self.source[y0:y0 + size:step, x0:x0 + size:step])
+        with self.lock:
+            # another thread may have loaded the same tile meanwhile
+            cached = self.tiles.get(key)
+            if cached is not None:
+                self.tiles.move_to_end(key)
+                return cached
+            self.tiles[key] = tile
+            self.bytes += tile.nbytes
+            while self.bytes > self.max_bytes and len(self.tiles) > 1:
+                _, evicted = self.tiles.popitem(last=False)
+                self.bytes -= evicted.nbytes
+        return tile
+
+    def sample(self, u, v, level=0):
+        """Return the (N, 3) uint8 colors at texture coordinates u and v, wrapping around."""
+        height, width = self.level_size(level)
+        x = np.floor(u * width).astype(np.int64) % width
+        y = np.floor(v * height).astype(np.int64) % height
+        tiles_across = -(-width // self.tile)
+        key = (y // self.tile) * tiles_across + x // self.tile
+        texels = np.empty((len(x),) + self.source.shape[2:], dtype=self.source.dtype)
+
+        # one gather per visible tile, only those tiles are ever read
+        order = np.argsort(key, kind='stable')
+        keys, starts = np.unique(key[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        for number, start, end in zip(keys.tolist(), starts.tolist(), ends.tolist()):
+            chosen = order[start:end]
+            row, column = divmod(number, tiles_across)
+            tile = self.load_tile(level, row, column)
+            texels[chosen] = tile[y[chosen] - row * self.tile, x[chosen] - column * self.tile]
+
+        if self.palette is None:
+            return texels.astype(np.uint8)
+        return self.palette[np.minimum(texels, len(self.palette) - 1)]
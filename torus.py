@@ -0,0 +1,135 @@
+from functools import lru_cache
+from numpy import (
+    array, cos, sin, pi, matmul, sqrt, stack, eye, rint, ones_like, zeros_like,
+    floor, flatnonzero, lexsort, ones, full, where,
+)
+
+# Torus geometry and lighting shared by the donut backends, no pygame needed
+
+# CONSTANTS
+size = 800  # projection is scaled for a size x size screen
+ASCII = ".,-~:;=!*#$@"
+# ASCII = "@BR#$PX0woIcv:+!~.,"[::-1]
+
+the_spacing = 0.35
+phi_spacing = 0.15
+phi_increment = 0.05  # increment for each frame
+
+r1 = 1
+r2 = 2
+k2 = 50
+k1 = size * k2 * 3 / (8 * (r1 + r2))
+
+light_dir = array((0, 1, -1))
+len_light_vec = sqrt(light_dir[0] ** 2 + light_dir[1] ** 2 + light_dir[2] ** 2)
+
+
+def get_angles(spacing):
+    angles = []
+    angle = 0
+    while angle <= 2 * pi:
+        angles.append(angle)
+        angle += spacing
+    return array(angles)
+
+
+def get_circle_and_normal(the_spacing=the_spacing):
+    the = get_angles(the_spacing)
+    zero = zeros_like(the)
+    circle = stack((r2 + r1 * cos(the), r1 * sin(the), zero), axis=1)
+    normal = stack((cos(the), sin(the), zero), axis=1)
+    return circle, normal
+
+
+# built once per spacing as (N, 3) arrays, shared between frames
+@lru_cache(maxsize=None)
+def get_torus_and_normal(the_spacing=the_spacing, phi_spacing=phi_spacing):
+    circle, normal = get_circle_and_normal(the_spacing)
+    phi = get_angles(phi_spacing)
+    c, s, one, zero = cos(phi), sin(phi), ones_like(phi), zeros_like(phi)
+    # one rotate_y matrix per phi, (P, 3, 3)
+    rotation_mats = stack(
+        (stack((c, zero, s), axis=1), stack((zero, one, zero), axis=1), stack((-s, zero, c), axis=1)),
+        axis=1,
+    )
+    torus = matmul(circle, rotation_mats).reshape(-1, 3)
+    torus_normal = matmul(normal, rotation_mats).reshape(-1, 3)
+    torus.flags.writeable = False
+    torus_normal.flags.writeable = False
+    return torus, torus_normal
+
+
+def rotate_y(point, phi):
+    rotation_mat = array([(cos(phi), 0, sin(phi)), (0, 1, 0), (-sin(phi), 0, cos(phi))])
+    return matmul(point, rotation_mat)
+
+
+def rotate_x(point, phi):
+    rotation_mat = array([(1, 0, 0), (0, cos(phi), sin(phi)), (0, -sin(phi), cos(phi))])
+    return matmul(point, rotation_mat)
+
+
+def rotate_z(point, phi):
+    rotation_mat = array([(cos(phi), sin(phi), 0), (-sin(phi), cos(phi), 0), (0, 0, 1)])
+    return matmul(point, rotation_mat)
+
+
+def rotate_torus(torus, normal, phi):
+    # x then z rotation combined into a single matrix
+    rotation_mat = rotate_z(rotate_x(eye(3), phi), phi)
+    return matmul(torus, rotation_mat), matmul(normal, rotation_mat)
+
+
+def project_torus(torus):
+    scale = k1 / (k2 + torus[:, 2])
+    return stack((scale * torus[:, 0], scale * torus[:, 1]), axis=1)
+
+
+def project_point(point):
+    x, y, z = point
+    return k1 * x / (k2 + z), k1 * y / (k2 + z)
+
+
+def shade_torus(phi, the_spacing=the_spacing, phi_spacing=phi_spacing):
+    """Return projected x, y and ASCII index of every lit point."""
+    torus, normal = get_torus_and_normal(the_spacing, phi_spacing)
+    rotated_torus, rotated_normal = rotate_torus(torus, normal, phi)
+    L = matmul(rotated_normal, light_dir)
+    lit = L > 0
+    projected = project_torus(rotated_torus[lit])
+    index = rint((len(ASCII) - 1) * L[lit] / len_light_vec).astype(int)
+    return projected[:, 0], projected[:, 1], index
+
+
+def resolve_cells(projected, ooz, L, columns, rows, cell_width, cell_height):
+    """Return a (rows, columns) grid of ASCII indices, -1 for empty cells.
+
+    The grid is centered on the origin. Like donut.c, every cell keeps only its
+    nearest point (largest 1/z), so occluded points are never drawn.
+    """
+    column = floor((columns * cell_width / 2 + projected[:, 0]) / cell_width).astype(int)
+    row = floor((rows * cell_height / 2 - projected[:, 1]) / cell_height).astype(int)
+    inside = flatnonzero((column >= 0) & (column < columns) & (row >= 0) & (row < rows))
+    cell = row[inside] * columns + column[inside]
+
+    # nearest point first within each cell
+    order = lexsort((-ooz[inside], cell))
+    cell = cell[order]
+    first = ones(cell.size, dtype=bool)
+    first[1:] = cell[1:] != cell[:-1]
+    nearest = inside[order[first]]
+
+    grid = full(rows * columns, -1)
+    index = rint((len(ASCII) - 1) * L[nearest] / len_light_vec).astype(int)
+    grid[cell[first]] = where(L[nearest] > 0, index, -1)
+    return grid.reshape(rows, columns)
+
+
+def shade_torus_grid(phi, columns, rows, cell_width, cell_height, the_spacing=the_spacing, phi_spacing=phi_spacing):
+    """Return the character grid of the torus at phi, see resolve_cells."""
+    torus, normal = get_torus_and_normal(the_spacing, phi_spacing)
+    rotated_torus, rotated_normal = rotate_torus(torus, normal, phi)
+    L = matmul(rotated_normal, light_dir)
+    projected = project_torus(rotated_torus)
+    ooz = 1 / (k2 + rotated_torus[:, 2])
+    return resolve_cells(projected, ooz, L, columns, rows, cell_width, cell_height)
@@ -0,0 +1,64 @@
+import numpy as np
+
+# Homogeneous transforms shared by the wireframe shapes.
+# A D-dimensional point is the row (x1, ..., xD, 1) and a frame's rotations,
+# perspective projections and screen scaling compose into a single matrix that
+# is applied to all vertices at once.
+
+
+def rotation(dim, i, j, theta):
+    """Rotation by theta in the plane of axes i and j, as a homogeneous matrix."""
+    matrix = np.eye(dim + 1)
+    c, s = np.cos(theta), np.sin(theta)
+    matrix[i, i] = c
+    matrix[i, j] = -s
+    matrix[j, i] = s
+    matrix[j, j] = c
+    return matrix
+
+
+def scale(dim, factor):
+    """Uniform scaling as a homogeneous matrix."""
+    matrix = np.eye(dim + 1)
+    matrix[:dim, :dim] *= factor
+    return matrix
+
+
+def perspective(dim, distance, focal=1.0, depth_scale=1.0):
+    """Perspective projection that drops the last axis of dim-dimensional points.
+
+    The remaining coordinates are multiplied by focal / (distance - depth_scale * d),
+    where d is the dropped coordinate. Returns a (dim, dim + 1) matrix taking
+    homogeneous dim-dimensional points to homogeneous (dim - 1)-dimensional ones,
+    so the divide is deferred until apply and projections can be chained.
+    """
+    matrix = np.zeros((dim, dim + 1))
+    matrix[: dim - 1, : dim - 1] = np.eye(dim - 1)
+    matrix[dim - 1, dim - 1] = -depth_scale / focal
+    matrix[dim - 1, dim] = distance / focal
+    return matrix
+
+
+def chain(*matrices):
+    """Compose matrices given in the order they are applied."""
+    result = matrices[0]
+    for matrix in matrices[1:]:
+        result = matrix @ result
+    return result
+
+
+def homogeneous(points):
+    """Append the homogeneous coordinate to (N, D) points."""
+    points = np.asarray(points, dtype=float)
+    return np.hstack((points, np.ones((len(points), 1))))
+
+
+def apply(matrix, points):
+    """Transform homogeneous (N, D + 1) points and do the perspective divide.
+
+    A stack of K matrices transforms the points once per matrix, into (K, N, D).
+    Points with w <= 0, behind a projection center, come out as NaN.
+    """
+    transformed = points @ np.swapaxes(matrix, -1, -2)
+    w = transformed[..., -1:]
+    return np.where(w > 0, transformed[..., :-1] / np.where(w > 0, w, 1), np.nan)
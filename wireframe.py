@@ -0,0 +1,140 @@
+import numpy as np
+import pygame
+
+from dirty import points_rect
+
+# Anti-aliased wireframe rasterizer. All edges of a shape are clipped to the
+# surface and go through one vectorized Xiaolin Wu line kernel, so the work is
+# bounded by the visible length of the lines. The brightest coverage per pixel is
+# blended into the surface's pixels at once, and the vertex markers are
+# stamped from one cached sprite with a single blits call.
+
+SUPERSAMPLE = 4
+
+
+def clip_segments(start, end, x0, y0, x1, y1):
+    """Liang-Barsky clip of many segments to the box from (x0, y0) to (x1, y1).
+
+    Returns which segments are kept and the parameters t0 <= t1 of the kept
+    part, 0 at start and 1 at end. Segments with non-finite endpoints are
+    dropped.
+    """
+    delta = end - start
+    p = np.stack((-delta[:, 0], delta[:, 0], -delta[:, 1], delta[:, 1]), axis=1)
+    q = np.stack((start[:, 0] - x0, x1 - start[:, 0], start[:, 1] - y0, y1 - start[:, 1]), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = q / p
+        t0 = np.where(p < 0, r, 0).max(axis=1)
+        t1 = np.where(p > 0, r, 1).min(axis=1)
+        # parallel to a side and outside of it
+        outside = ((p == 0) & (q < 0)).any(axis=1)
+        finite = np.isfinite(start).all(axis=1) & np.isfinite(end).all(axis=1)
+        keep = finite & ~outside & (t0 <= t1)
+    return keep, t0, t1
+
+
+def wu_samples(start, end):
+    """Xiaolin Wu samples of many segments at once.
+
+    Returns pixel x, y, coverage, the segment of every sample and its position
+    t along the segment, 0 at start and 1 at end. Endpoints are not gap
+    corrected, the vertex markers cover them.
+    """
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    # walk along the major axis from the lower end
+    steep = np.abs(end[:, 1] - start[:, 1]) > np.abs(end[:, 0] - start[:, 0])
+    a = np.where(steep[:, None], start[:, ::-1], start)
+    b = np.where(steep[:, None], end[:, ::-1], end)
+    flip = a[:, 0] > b[:, 0]
+    a, b = np.where(flip[:, None], b, a), np.where(flip[:, None], a, b)
+    dx = b[:, 0] - a[:, 0]
+    gradient = (b[:, 1] - a[:, 1]) / np.where(dx > 0, dx, 1)
+
+    first = np.rint(a[:, 0]).astype(np.int64)
+    counts = np.rint(b[:, 0]).astype(np.int64) - first + 1
+    segment = np.repeat(np.arange(len(start)), counts)
+    major = first[segment] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    minor = a[segment, 1] + gradient[segment] * (major - a[segment, 0])
+    t = np.clip((major - a[segment, 0]) / np.where(dx > 0, dx, 1)[segment], 0, 1)
+    t = np.where(flip[segment], 1 - t, t)
+
+    # every sample covers the two pixels straddling the ideal line
+    low = np.floor(minor)
+    fraction = minor - low
+    major = np.concatenate((major, major))
+    minor = np.concatenate((low, low + 1)).astype(np.int64)
+    steep = np.concatenate((steep[segment], steep[segment]))
+    x = np.where(steep, minor, major)
+    y = np.where(steep, major, minor)
+    return x, y, np.concatenate((1 - fraction, fraction)), np.concatenate((segment, segment)), np.concatenate((t, t))
+
+
+def marker_sprite(radius, color):
+    """A filled anti-aliased disc of radius pixels, with alpha."""
+    size = 2 * radius + 1
+    # coverage of every pixel, from SUPERSAMPLE x SUPERSAMPLE points
+    offsets = (np.arange(size * SUPERSAMPLE) + 0.5) / SUPERSAMPLE - radius - 0.5
+    x, y = np.meshgrid(offsets, offsets, indexing="ij")
+    inside = (x * x + y * y <= (radius + 0.5) ** 2).reshape(size, SUPERSAMPLE, size, SUPERSAMPLE)
+    coverage = inside.mean(axis=(1, 3))
+    sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+    sprite.fill(color)
+    alpha = pygame.surfarray.pixels_alpha(sprite)
+    alpha[:] = (coverage * 255).astype(np.uint8)
+    del alpha
+    return sprite
+
+
+class WireframeRasterizer:
+    """Draws projected vertices and their (E, 2) edges anti-aliased in one pass."""
+
+    def __init__(self, color=(255, 255, 255), marker_radius=5):
+        self.color = np.array(color[:3], dtype=np.float32)
+        self.marker_radius = marker_radius
+        self.sprite = marker_sprite(marker_radius, color)
+
+    def draw(self, surface, projected, edges, intensity=None):
+        """Draw onto surface, return the rect that was drawn.
+
+        intensity optionally dims each vertex, 0 to 1, and is interpolated
+        along the edges, for example to fade vertices with depth. Vertices
+        that are not finite are skipped along with their edges.
+        """
+        width, height = surface.get_size()
+        start, end = projected[edges[:, 0]], projected[edges[:, 1]]
+        # a pixel beyond every side, the samples straddle the ideal line
+        keep, t0, t1 = clip_segments(start, end, -1, -1, width, height)
+        edges, start, end, t0, t1 = edges[keep], start[keep], end[keep], t0[keep], t1[keep]
+        delta = end - start
+        x, y, coverage, segment, t = wu_samples(start + t0[:, None] * delta, start + t1[:, None] * delta)
+        if intensity is not None:
+            t = t0[segment] + (t1 - t0)[segment] * t  # back to the unclipped edge
+            first, last = intensity[edges[segment, 0]], intensity[edges[segment, 1]]
+            coverage = coverage * (first + (last - first) * t)
+        inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        x, y, coverage = x[inside], y[inside], coverage[inside]
+
+        if x.size:
+            # samples written dimmest first, so where lines cross the last
+            # write, the brightest, wins; a radix sort on the 8-bit level
+            level = (coverage * 255).astype(np.uint8)
+            order = np.argsort(level, kind='stable')
+            x, y = x[order], y[order]
+            colors = (level[order, None] * (self.color / 255)).astype(np.uint8)
+            pixels = pygame.surfarray.pixels3d(surface)
+            pixels[x, y] = np.maximum(pixels[x, y], colors)
+            del pixels
+
+        radius = self.marker_radius
+        markers = projected[
+            (projected[:, 0] > -radius - 1) & (projected[:, 0] < width + radius)
+            & (projected[:, 1] > -radius - 1) & (projected[:, 1] < height + radius)
+        ]
+        surface.blits(
+            [(self.sprite, (vx - radius, vy - radius)) for vx, vy in np.rint(markers).astype(int).tolist()],
+            doreturn=False,
+        )
+        finite = projected[np.isfinite(projected).all(axis=1)]
+        drawn = points_rect(finite[:, 0], finite[:, 1], radius + 2)
+        return drawn and drawn.clip(surface.get_rect())